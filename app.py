@@ -1,8 +1,8 @@
-import plotly.express as px
 import streamlit as st
 from backend import initial_state
 from backend import recsys
-from backend import llm
+from backend.registry import recommenders
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import os
 import sys
 import asyncio
@@ -17,30 +17,29 @@ sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
 
 st.set_page_config(layout="wide")
 
-st.session_state.thread = copy.deepcopy(initial_state.thread)
+# Items are never modified, so sessions share them and only own the list they append to
+st.session_state.thread = list(initial_state.thread)
 st.session_state.topics = copy.deepcopy(initial_state.topics)
 print("User action: Chat history initialized.")
 
-# Instantiating ML stuff
-llm = llm.ChatMistralAI(
-    model="mistral-large-latest",
-    temperature=0,
-    max_retries=5,
-    mistral_api_key=os.getenv("MISTRAL_API_KEY")
-)
-
 # Set up the main layout
 col1, col2 = st.columns([3, 2])
 
 
-rec = initial_state.new_recommender()
+# Reuse this user's recommender across reruns, restoring it from its snapshot after a restart
+username = st.session_state.get("username")
+user_key = username or get_script_run_ctx().session_id
+# Anonymous sessions are never saved, their id is not seen again once they end
+rec = recommenders.get(user_key, persist=bool(username))
 
 @st.fragment(run_every=5)
 def run_recommendation_system():
-    print("Polling recommendation system")
-    item = rec.sample()
+    try:
+        item = rec.sample()
+    except recsys.SamplerError as e:
+        print(f"Could not sample: {e}")
+        return
     st.session_state.thread.append(item) 
-    print(len(st.session_state.thread))
     display_chat([item])
 
 
@@ -97,6 +96,7 @@ with col2:
 
     # print(labels, weights, topics, times)
 
+    import plotly.express as px
     fig = px.bar(x=labels, y=weights, labels={
                  'x': 'Topics', 'y': 'User Preference'}, title='Histogram of Topics and Weights', color=topics)
     fig.update_layout(showlegend=False)
@@ -105,8 +105,9 @@ with col2:
     st.plotly_chart(fig)
 
 if st.button("Refresh State"):
-    st.session_state.thread = copy.deepcopy(initial_state.thread)
+    st.session_state.thread = list(initial_state.thread)
     st.session_state.topics = copy.deepcopy(initial_state.topics)
+    recommenders.reset(user_key)
     print("State refreshed")
     st.rerun()
 
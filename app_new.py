@@ -1,14 +1,21 @@
-import plotly.express as px
 import streamlit as st
 import backend.initial_state as initial_state
 import backend.recsys as recsys
 import backend.llm as llm
+from backend.fastpath import InterestScorer
+from backend.history import ThreadHistory
+from backend.metrics import metrics
+from backend.registry import recommenders
+from backend.snapshot import temporary_item_log
+from backend.scheduler import scheduler
+from push_notfications import send_push
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from frontend.stats import show_stats
 import os
 import sys
 import asyncio
 import copy
-import pandas as pd
-from tabulate import tabulate
+import time
 
 testdir = os.path.dirname(__file__)
 srcdir = './frontend'
@@ -18,23 +25,48 @@ sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
 
 st.set_page_config(layout="wide")
 
+# Logged-in users keep their state across restarts, anonymous ones only for the browser session,
+# since a session id is never seen again once the session ends
+username = st.session_state.get("username")
+user_key = username or get_script_run_ctx().session_id
+
+# Number of most recent thread items rendered per rerun, grown by "Load older messages"
+PAGE_SIZE = 50
+
 if "thread" not in st.session_state:
-    st.session_state.thread = copy.deepcopy(initial_state.thread)
+    # Only the recent end of the thread stays in session memory, the rest lives in the user's item
+    # log, or for anonymous sessions in a temporary one that goes away with the session state
+    log = recommenders.store.item_log(user_key) if username else temporary_item_log()
+    st.session_state.thread = ThreadHistory(log)
+    if not len(st.session_state.thread):
+        st.session_state.thread.extend(initial_state.thread)
+if "window" not in st.session_state:
+    st.session_state.window = PAGE_SIZE
 if "topics" not in st.session_state:
     st.session_state.topics = copy.deepcopy(initial_state.topics)
+    # Each topic is prepared ahead of its time and delivered through the outbox drained below
+    scheduler.schedule(user_key, st.session_state.topics, persist=bool(username))
+
 
-# Instantiating ML stuff
-llm2 = llm.ChatMistralAI(
-    model="mistral-large-latest",
-    temperature=0,
-    max_retries=5,
-    mistral_api_key=os.getenv("MISTRAL_API_KEY")
-)
 
-rec = initial_state.new_recommender()
+def get_llm():
+    # Created on the first message that needs it, not on every rerun
+    if "llm" not in st.session_state:
+        st.session_state.llm = llm.ChatMistralAI(
+            model="mistral-large-latest",
+            temperature=0,
+            max_retries=5,
+            mistral_api_key=os.getenv("MISTRAL_API_KEY")
+        )
+    return st.session_state.llm
+
+# Reuse this user's recommender across reruns, restoring it from its snapshot after a restart
+rec = recommenders.get(user_key, persist=bool(username))
 
 if "arms" not in st.session_state:
     st.session_state.arms = rec.get_arms()["arms"]
+if "fast_scorer" not in st.session_state:
+    st.session_state.fast_scorer = InterestScorer()
 
 def show_message(item):
     if isinstance(item, recsys.GNewsItem):
@@ -50,12 +82,31 @@ def show_message(item):
         with st.chat_message(item.sender):
             st.markdown(item.message)
 
+def show_feedback(item, position):
+    # Votes go straight to the bandit, no LLM call needed
+    key = getattr(item, "key", None)
+    if key is None:
+        return
+    up, down, _ = st.columns([1, 1, 10])
+    for column, event, label in ((up, "upvote", "👍"), (down, "downvote", "👎")):
+        if column.button(label, key=f"{event}-{position}-{key}"):
+            rec.record_feedback(key, event)
+
 st.header("Fred")
 st.subheader("Your friendly neighborhood AI Curator")
 
 
-with st.container(border=False):
-    arms = st.session_state.arms
+def describe_changes(changes: recsys.ArmChanges) -> str:
+    if not changes:
+        return "Your preferences are unchanged."
+    lines = [f"- {name}: {fields['score'][0]:.1f} → {fields['score'][1]:.1f}"
+             for name, fields in changes.changed.items() if 'score' in fields]
+    lines += [f"- Added {name}" for name in changes.added]
+    lines += [f"- Removed {name}" for name in changes.removed]
+    return "Updated your preferences:\n\n" + "\n".join(lines)
+
+
+def show_arms_chart(arms, key="arms_chart"):
     topics = [arm["name"] for arm in arms]
     weights = [arm["score"] for arm in arms]
     # times = [arm.pulls for arm in arms]
@@ -65,20 +116,35 @@ with st.container(border=False):
     weights, topics = zip(*sorted_topics_weights)
 
 
+    import plotly.express as px
     fig = px.bar(x=topics, y=weights, labels={
                     'x': 'Topics', 'y': 'User Preference'}, title='Histogram of Topics and Weights', color=topics)
     fig.update_layout(showlegend=False)
     fig.update_layout(height=300, font=dict(size=12))  # Set the height to be smaller
 
-    st.plotly_chart(fig)
+    st.plotly_chart(fig, key=key)
+
+
+with st.sidebar.expander("Stats"):
+    show_stats()
+
+# Placeholder so the chart can be redrawn while arm updates stream in
+chart_slot = st.empty()
+with chart_slot.container(border=False):
+    show_arms_chart(st.session_state.arms)
+
 
+if len(st.session_state.thread) > st.session_state.window:
+    if st.button("Load older messages"):
+        st.session_state.window += PAGE_SIZE
+        st.rerun()
 
-for item in st.session_state.thread:
+for position, item in enumerate(st.session_state.thread.window(st.session_state.window)):
     show_message(item)
+    show_feedback(item, position)
 
 
 if user_input := st.chat_input("Talk to your AI Curator", key="user_input"):
-    print("user_input ", user_input)
     print(F"User action: Sending message - {user_input}")
     item = recsys.ChatItem({"sender": "user", "message":user_input})
     st.session_state.thread.append(item)
@@ -95,31 +161,56 @@ if user_input := st.chat_input("Talk to your AI Curator", key="user_input"):
         with st.chat_message(item.sender):
             st.markdown(item.message)   
     original_arms = rec.get_arms()
-    topics_old = [arm["name"] for arm in original_arms["arms"]]
-    weights_old = [arm["score"] for arm in original_arms["arms"]]
-    updated_arms = llm.update_arm_scores(llm2, original_arms, user_input)
-    rec.update_arms(updated_arms.dict())
+    with st.chat_message("AI"):
+        progress = st.empty()
+        progress.markdown("Updating your preferences...")
+        # Simple feedback on existing topics is scored locally, everything else goes to the LLM
+        fast = st.session_state.fast_scorer.score(original_arms, user_input)
+        if fast.handled:
+            changes = rec.update_arms(fast.arms_config)
+            st.session_state.fast_scorer.record("local", fast.latency)
+            metrics.observe("feedback_seconds", fast.latency, path="local")
+        else:
+            start = time.perf_counter()
+            # Apply each arm as soon as the LLM has generated it
+            streamed_arms = []
+            changes = recsys.ArmChanges()
+            try:
+                for arm in llm.stream_arm_scores(get_llm(), original_arms, user_input):
+                    changes.merge(rec.update_arm(arm.dict()))
+                    streamed_arms.append(arm.dict())
+                    progress.markdown("Updating your preferences...\n\n" + "\n\n".join(
+                        f"{arm['name']}: {arm['score']}" for arm in streamed_arms))
+                    with chart_slot.container(border=False):
+                        show_arms_chart(rec.get_arms()["arms"], key=f"arms_chart_{len(streamed_arms)}")
+            except Exception as e:
+                # Keep the arms applied so far, but don't drop the rest on an incomplete answer
+                print(f"Could not finish scoring the message: {e}")
+            else:
+                # Drop the arms the LLM left out, as a full update would
+                changes.merge(rec.update_arms({'arms': streamed_arms}))
+            st.session_state.fast_scorer.record("llm", time.perf_counter() - start)
+            metrics.observe("feedback_seconds", time.perf_counter() - start, path="llm")
+        recommenders.save(user_key)
     st.session_state.arms = rec.get_arms()["arms"]
-    topics = [arm["name"] for arm in rec.get_arms()["arms"]]
-    weights = [arm["score"] for arm in rec.get_arms()["arms"]]
-    print(weights)
-    print(topics)
-    sorted_topics_weights = sorted(zip(weights, topics), reverse=True)
-    weights, topics = zip(*sorted_topics_weights)
-    message = f"""Updating preferences from\n
-    {str(dict(zip(topics_old,   weights_old)))}\n
-    to\n
-    {str(dict(zip(topics, weights)))}
-    """
+    message = describe_changes(changes)
     st.session_state.thread.append(recsys.ChatItem({"sender": "AI", "message": message}))
-    with st.chat_message("AI"):
-        st.markdown(message)
+    progress.markdown(message)
         
 
 
+if st.button("Morning brief"):
+    # One item per topic, fetched concurrently
+    st.session_state.thread.extend(rec.sample_digest(len(st.session_state.topics)))
+    st.rerun()
+
+
 if st.button("Refresh State"):
-    st.session_state.thread = copy.deepcopy(initial_state.thread)
+    st.session_state.thread.reset(initial_state.thread)
+    st.session_state.window = PAGE_SIZE
     st.session_state.topics = copy.deepcopy(initial_state.topics)
+    scheduler.schedule(user_key, st.session_state.topics, persist=bool(username))
+    recommenders.reset(user_key)
     print("State refreshed")
     st.rerun()
 
@@ -127,14 +218,34 @@ if st.button("Refresh State"):
 
 @st.fragment(run_every=10)
 def run_recommendation_system():
-    print("Polling recommendation system")
-    item = rec.sample()
+    try:
+        item = rec.sample()
+    except recsys.SamplerError as e:
+        # The upstream is down and there is nothing cached for the arm, try again next tick
+        print(f"Could not sample: {e}")
+        return
+    key = getattr(item, "key", None)
+    last = st.session_state.thread.window(1)
+    if key is not None and last and getattr(last[-1], "key", None) == key:
+        # A fallback to the arm's last item, already on screen
+        return
     st.session_state.thread.append(item) 
     # display_chat()
     st.rerun()
 
 run_recommendation_system()
 
+
+@st.fragment(run_every=1)
+def deliver_scheduled():
+    # Scheduled items are ready in the outbox at their time, so this only has to drain it
+    for item in scheduler.drain(user_key):
+        st.session_state.thread.append(item)
+        show_message(item)
+        send_push(title=getattr(item, "title", "Your scheduled update"), body=str(item)[:200])
+
+deliver_scheduled()
+
 # print(vars(chat_container))
 # @st.fragment
 # def send_message():
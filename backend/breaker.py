@@ -0,0 +1,77 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        """
+        Stops calling an unhealthy upstream for a while after repeated failures.
+
+        The breaker opens after `failure_threshold` consecutive failures and rejects calls for
+        `cooldown` seconds. It then lets a single trial call through: a success closes it again,
+        a failure opens it for another cool-down. A trial that never reports back is given up
+        after one cool-down, so a hung call cannot keep the breaker half open.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker.
+            cooldown (float): Seconds calls are rejected for once the breaker is open.
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at = None
+        self._trial_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            if self._trial_at is not None or time.monotonic() - self._opened_at >= self.cooldown:
+                return self.HALF_OPEN
+            return self.OPEN
+
+    def allow(self) -> bool:
+        """Returns whether a call may go through now. The caller must report its outcome."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.cooldown:
+                return False
+            if self._trial_at is not None and now - self._trial_at < self.cooldown:
+                return False
+            self._trial_at = now
+            return True
+
+    def retry_in(self) -> float:
+        """Returns the seconds until the next call is let through, 0.0 if calls are allowed."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            started = self._opened_at if self._trial_at is None else self._trial_at
+            return max(0.0, started + self.cooldown - time.monotonic())
+
+    def record_success(self) -> bool:
+        """Closes the breaker. Returns True if it was not closed before."""
+        with self._lock:
+            reopened = self._opened_at is not None
+            self.failures = 0
+            self._opened_at = None
+            self._trial_at = None
+            return reopened
+
+    def record_failure(self) -> bool:
+        """Counts a failure. Returns True if this opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            if self._trial_at is not None or (self._opened_at is None and self.failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._trial_at = None
+                return True
+            return False
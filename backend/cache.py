@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Callable, Hashable
+
+
+class TTLCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0, max_stale: float = 0.0):
+        """
+        Thread-safe, size-bounded cache with a per-entry time to live and LRU eviction.
+
+        Args:
+            max_entries (int): Maximum number of entries kept; the least recently used one is evicted first.
+            ttl (float): Seconds an entry stays valid after it was stored.
+            max_stale (float): Seconds past its ttl that get_or_load() may still return an entry
+                while it is reloaded, or when reloading it fails.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refresh_errors = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> lock held while the value is being loaded
+        self._refreshing = set()  # Keys being reloaded in the background
+
+    def get(self, key: Hashable, default=None):
+        """Returns the cached value for key, or default if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None and entry[0] + self.max_stale <= time.monotonic():
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key: Hashable, default=None):
+        """Returns the cached value for key even if expired, within max_stale, without loading it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] + self.max_stale > time.monotonic():
+                return entry[1]
+            return default
+
+    def set(self, key: Hashable, value, ttl: float = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, load: Callable, refresh: Executor = None):
+        """
+        Returns the cached value for key, calling load() to fill it on a miss.
+
+        Concurrent misses on the same key wait for a single load instead of all hitting the upstream.
+        An expired entry less than max_stale seconds past its ttl is still used: with a `refresh`
+        executor it is returned right away and reloaded there in the background, one reload per
+        key at a time. Without one, load() is called and the stale value is only returned if it raises.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if refresh is not None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] + self.max_stale > time.monotonic():
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        refresh.submit(self._refresh, key, load)
+                    return entry[1]
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have loaded the value while we were waiting
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                stale = entry
+            try:
+                value = load()
+                self.set(key, value)
+                return value
+            except Exception:
+                if stale is None or stale[0] + self.max_stale <= time.monotonic():
+                    raise
+                with self._lock:
+                    self.stale_hits += 1
+                return stale[1]
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def _refresh(self, key: Hashable, load: Callable):
+        try:
+            self.set(key, load())
+        except Exception:
+            # The stale value is kept until it is max_stale past its ttl
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_hits': self.stale_hits,
+                'refresh_errors': self.refresh_errors,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_MISSING = object()
@@ -0,0 +1,165 @@
+import re
+import time
+from typing import Dict, List, Set
+
+# Words that say nothing about the topic itself
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "on", "in", "to", "for", "about", "with", "from", "me", "my",
+    "i", "im", "i'm", "you", "your", "it", "its", "is", "are", "be", "am", "this", "that", "these", "those",
+    "please", "pls", "some", "any", "much", "many", "very", "really", "so", "too", "just", "can", "could",
+    "would", "will", "show", "send", "sending", "sent", "give", "get", "see", "seeing", "news", "articles",
+    "article", "stuff", "things", "content", "updates", "update", "comics", "comic", "posts", "anymore",
+    "thanks", "thank", "ok", "okay", "all", "them", "they", "up",
+}
+
+# Intent words and the score change they imply
+STRONG_NEGATIVE = {"stop", "never", "remove", "unsubscribe", "hate", "block", "mute"}
+NEGATIVE = {"less", "fewer", "no", "not", "dont", "don't", "dislike", "enough", "boring", "bored", "skip"}
+STRONG_POSITIVE = {"love", "lots", "loads", "obsessed", "amazing"}
+POSITIVE = {"more", "like", "enjoy", "want", "keep", "interested", "great", "nice", "cool"}
+INTENT_WORDS = STRONG_NEGATIVE | NEGATIVE | STRONG_POSITIVE | POSITIVE
+
+
+# Clause boundaries, so that "more cricket and less weather" gets one intent per topic
+CLAUSE_BREAK = re.compile(r"[,;.!?]|\b(?:and|but|while|whereas)\b")
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+class FastPathResult:
+    def __init__(self, handled: bool, arms_config: dict = None, changed: Dict[str, float] = {},
+                 confidence: float = 0.0, reason: str = "", latency: float = 0.0):
+        """
+        Outcome of scoring a message locally.
+
+        Args:
+            handled (bool): True if the local scorer is confident enough to skip the LLM.
+            arms_config (dict): Updated configuration for Recommender.update_arms, None if not handled.
+            changed (Dict[str, float]): New score per changed arm.
+            confidence (float): Share of the message's topic words that matched an existing arm.
+            reason (str): Why the message was or was not handled locally.
+            latency (float): Seconds spent scoring.
+        """
+        self.handled = handled
+        self.arms_config = arms_config
+        self.changed = changed
+        self.confidence = confidence
+        self.reason = reason
+        self.latency = latency
+
+    def __str__(self):
+        path = "local" if self.handled else "llm"
+        return f"{path} path ({self.reason}, confidence {self.confidence:.2f}, {self.latency * 1e3:.2f} ms)"
+
+
+class InterestScorer:
+    def __init__(self, min_confidence: float = 0.75, step: float = 2.0, strong_step: float = 3.0):
+        """
+        CPU-only scorer for simple feedback such as "more cricket please" or "stop sending XKCD".
+
+        Messages are matched against a token index over each arm's name and query/topic params.
+        The intent is read per clause, and carries over to following clauses without an intent
+        word ("more cricket and tennis"). Messages without a clear intent word, without a
+        matching arm, mentioning unknown topic words, or asking for opposite changes to the
+        same arm are left to the LLM.
+
+        Args:
+            min_confidence (float): Minimum share of topic words that must match existing arms.
+            step (float): Score change for plain positive/negative feedback.
+            strong_step (float): Score increase for strong positive feedback. Strong negative
+                feedback drops the arm to the minimum score.
+        """
+        self.min_confidence = min_confidence
+        self.step = step
+        self.strong_step = strong_step
+        self._index_key = None
+        self._index: Dict[str, Set[str]] = {}
+        # Messages handled and total seconds spent, per path ('local' or 'llm')
+        self.path_stats = {'local': {'count': 0, 'seconds': 0.0}, 'llm': {'count': 0, 'seconds': 0.0}}
+
+    def _token_index(self, arms: List[dict]) -> Dict[str, Set[str]]:
+        """Returns token -> arm names, rebuilt only when arm names or params change."""
+        key = tuple((arm['name'], str(arm['params'])) for arm in arms)
+        if key != self._index_key:
+            index = {}
+            for arm in arms:
+                params = arm['params'] if isinstance(arm['params'], dict) else {}
+                text = " ".join([arm['name'], str(params.get('query', '')), str(params.get('topic', ''))])
+                for token in tokenize(text):
+                    if token not in STOPWORDS:
+                        index.setdefault(token, set()).add(arm['name'])
+            self._index_key, self._index = key, index
+        return self._index
+
+    def _delta(self, tokens: Set[str]):
+        """Returns the intent's score change, None for no clear intent, or 'min' to mute the arm."""
+        negative = tokens & (STRONG_NEGATIVE | NEGATIVE)
+        positive = tokens & (STRONG_POSITIVE | POSITIVE)
+        if negative:
+            # "no more X" and "don't like X" are negative even though they contain positive words
+            return "min" if tokens & STRONG_NEGATIVE else -self.step
+        if positive:
+            return self.strong_step if tokens & STRONG_POSITIVE else self.step
+        return None
+
+    def score(self, arms_config: dict, message: str) -> FastPathResult:
+        """
+        Scores a message against the current arms without calling the LLM.
+
+        Args:
+            arms_config (dict): Current configuration, as returned by Recommender.get_arms().
+            message (str): The user's chat message.
+        """
+        start = time.perf_counter()
+        arms = arms_config.get('arms', [])
+        index = self._token_index(arms)
+        tokens = tokenize(message)
+        topic_words = [token for token in tokens if token not in STOPWORDS and token not in INTENT_WORDS]
+        matched_words = [token for token in topic_words if token in index]
+        confidence = len(matched_words) / len(topic_words) if topic_words else 0.0
+
+        def result(handled, reason, **kwargs):
+            return FastPathResult(handled, confidence=confidence, reason=reason,
+                                  latency=time.perf_counter() - start, **kwargs)
+
+        if not matched_words:
+            return result(False, "no matching arm")
+        if confidence < self.min_confidence:
+            return result(False, "unknown topic words")
+
+        deltas = {}  # Arm name -> score change
+        delta = None
+        for clause in CLAUSE_BREAK.split(message):
+            clause_tokens = tokenize(clause)
+            clause_delta = self._delta(set(clause_tokens))
+            if clause_delta is not None:
+                delta = clause_delta
+            targets = set()
+            for token in clause_tokens:
+                if token in index and token not in INTENT_WORDS:
+                    targets |= index[token]
+            if not targets:
+                continue
+            if delta is None:
+                return result(False, "no clear intent")
+            for name in targets:
+                if deltas.setdefault(name, delta) != delta:
+                    return result(False, "conflicting intents")
+
+        changed = {}
+        new_arms = []
+        for arm in arms:
+            arm = dict(arm)
+            delta = deltas.get(arm['name'])
+            if delta is not None:
+                score = 1.0 if delta == "min" else min(10.0, max(1.0, arm['score'] + delta))
+                changed[arm['name']] = arm['score'] = score
+            new_arms.append(arm)
+        return result(True, "matched existing arms", arms_config={'arms': new_arms}, changed=changed)
+
+    def record(self, path: str, seconds: float):
+        """Records which path ('local' or 'llm') handled a message and how long it took."""
+        self.path_stats[path]['count'] += 1
+        self.path_stats[path]['seconds'] += seconds
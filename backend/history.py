@@ -0,0 +1,46 @@
+from collections import deque
+from itertools import islice
+from typing import Iterable, List
+
+from backend.recsys import Item
+from backend.snapshot import ItemLog
+
+
+class ThreadHistory:
+    def __init__(self, log: ItemLog, max_in_memory: int = 200):
+        """
+        A user's chat thread, with only the most recent items kept in memory.
+
+        Every item is appended to the user's ItemLog; older items are read back from it on demand.
+
+        Args:
+            log (ItemLog): The user's item log, holding the full thread.
+            max_in_memory (int): Number of most recent items kept in memory.
+        """
+        self.log = log
+        self.recent = deque(log[-max_in_memory:], maxlen=max_in_memory)
+
+    def append(self, item: Item):
+        self.log.append(item)
+        self.recent.append(item)
+
+    def extend(self, items: Iterable[Item]):
+        for item in items:
+            self.append(item)
+
+    def reset(self, items: Iterable[Item]):
+        """Replaces the whole thread with the given items."""
+        self.log.clear()
+        self.recent.clear()
+        self.extend(items)
+
+    def window(self, size: int) -> List[Item]:
+        """Returns the last `size` items, oldest first, reading from the log only beyond memory."""
+        total = len(self.log)
+        size = min(size, total)
+        if size <= len(self.recent):
+            return list(islice(self.recent, len(self.recent) - size, None))
+        return self.log.read(total - size, total - len(self.recent)) + list(self.recent)
+
+    def __len__(self):
+        return len(self.log)
@@ -1,9 +1,10 @@
 from datetime import time
 
+from backend.policy import ThompsonBandit
 from backend.recsys import Arm, ChatItem, GNewsItem, XKCDItem, Recommender, SamplerType
 
-# Convert the thread into ChatItem objects
-thread = [
+# Convert the thread into ChatItem objects. A tuple, since sessions share these items instead of copying them
+thread = (
     ChatItem({"sender": "Assistant", "message": "Hello! I'm your personal assistant. I can help you with keeping track of news, share memes, and even send weather updates! Let me know how I can assist you!"}),
     ChatItem(
         {"sender": "User", "message": "Give me a brief on the weather every morning."}),
@@ -26,7 +27,7 @@ thread = [
         # "image_name": "funny_comic",
         "link": "https://xkcd.com/1234/"
     })
-]
+)
 
 
 memory = [
@@ -48,7 +49,7 @@ topics = [{
 }]
 
 
-def new_recommender():
+def new_recommender(prefetch=True, samplers=None, bandit_cls=ThompsonBandit):
     # initialize arms and bandit
     arms = []
     for i, topic in enumerate(topics):
@@ -57,5 +58,8 @@ def new_recommender():
 
     arms.append(Arm('XKCD', {}, sampler_type=SamplerType.XKCD, init_score=1.0))
     # arms.append(Arm('Arxiv', {'topic': 'neural networks'}, sampler_type=SamplerType.ARXIV, init_score=5.0))
-    rec = Recommender(arms)
+    # Upvotes and downvotes adjust the Thompson posteriors right away, the LLM only rewrites scores
+    rec = Recommender(arms, prefetch=prefetch, samplers=samplers, bandit_cls=bandit_cls)
+    for item in thread:
+        rec.mark_seen(item)
     return rec
@@ -1,12 +1,12 @@
 from pydantic import BaseModel, Field, ValidationError, confloat
 from enum import Enum
-from typing import Dict, Literal, Union, List
+from typing import Dict, Iterator, Literal, Union, List
 import datetime
 import os
-from backend.initial_state import new_recommender
-from langchain_mistralai import ChatMistralAI
-from langchain.output_parsers import PydanticOutputParser
-from langchain_core.prompts import PromptTemplate
+import re
+from backend.llm_cache import ArmScoreCache, prompt_version
+from backend.metrics import metrics
+# LangChain is imported on first use, it takes longer to import than the rest of the app
 
 
 class SamplerTypeEnum(str, Enum):
@@ -28,18 +28,7 @@ class ArmModel(BaseModel):
 class ArmsConfig(BaseModel):
     arms: List[ArmModel]
 
-# Function to update the scores using the LLM
-
-
-def update_arm_scores(llm, arms_config: dict, query: str):
-    print(arms_config)
-    print(query)
-    # Define the Pydantic parser
-    parser = PydanticOutputParser(pydantic_object=ArmsConfig)
-
-    # Create the prompt template
-    prompt = PromptTemplate(
-        template="""###Scoring User Interest Based on Feedback and Content Samplers
+SCORING_TEMPLATE = """###Scoring User Interest Based on Feedback and Content Samplers
 
 You are an advanced AI tasked with helping the user navigate various types of content. Based on user interactions and feedback (such as upvotes, downvotes, clicks on articles, or direct conversations with you), your job is to assess the user's interest in different topics. You will assign or adjust a score on a scale from 1 to 10 for each content sampler based on this feedback, and if necessary, introduce new topics with an initial score based on the user's behavior. Here's how to approach the task:
 
@@ -87,20 +76,203 @@ Update the arms based on the query:
 {query}
 
 {format_instructions}
-""",
-        input_variables=["topics", "query"],
-        partial_variables={
-            "format_instructions": parser.get_format_instructions()},
-    )
+"""
+
+
+class ArmScorer:
+    def __init__(self, llm, cache: ArmScoreCache = None):
+        """
+        Scores arms with the LLM through a prompt | llm | parser chain that is built once and reused.
+
+        Args:
+            llm: LangChain chat model, e.g. ChatMistralAI.
+            cache (ArmScoreCache): Response cache consulted before calling the LLM, None to disable.
+        """
+        self.llm = llm
+        self.cache = cache
+        from langchain.output_parsers import PydanticOutputParser
+        from langchain_core.prompts import PromptTemplate
+
+        self.model_name = getattr(llm, "model", None) or type(llm).__name__
+        # Define the Pydantic parser
+        self.parser = PydanticOutputParser(pydantic_object=ArmsConfig)
+
+        # Create the prompt template
+        format_instructions = self.parser.get_format_instructions()
+        self.prompt = PromptTemplate(
+            template=SCORING_TEMPLATE,
+            input_variables=["topics", "query"],
+            partial_variables={
+                "format_instructions": format_instructions},
+        )
+        # Cached responses are only reused for the same prompt and response schema
+        self.prompt_version = prompt_version(SCORING_TEMPLATE, format_instructions)
+
+        # Create the chain (Prompt | LLM | Parser)
+        self.chain = self.prompt | llm | self.parser
+
+    def _cached(self, arms_config: dict, query: str):
+        """Returns (cache key, cached ArmsConfig or None)."""
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(arms_config, query, self.model_name, self.prompt_version)
+        response = self.cache.get(key)
+        metrics.inc("llm_cache_lookups_total", result="miss" if response is None else "hit")
+        return key, ArmsConfig.parse_raw(response) if response is not None else None
+
+    def _store(self, key: str, result: ArmsConfig):
+        if key is not None:
+            self.cache.set(key, result.json(), model=self.model_name)
+
+    def invoke(self, arms_config: dict, query: str) -> ArmsConfig:
+        key, result = self._cached(arms_config, query)
+        if result is None:
+            # Invoke the LLM with the arm configuration as input
+            with metrics.timed("llm_score", mode="invoke", model=self.model_name):
+                result = self.chain.invoke({"topics": arms_config, "query": query})
+            self._store(key, result)
+        return result
+
+    def stream(self, arms_config: dict, query: str) -> Iterator[ArmModel]:
+        """
+        Yields each ArmModel as soon as the LLM has finished generating it.
+
+        The full result is cached once the stream completes.
+
+        Raises:
+            OutputParserException: If the output has no complete "arms" array or does not parse
+                as a whole. Arms yielded before that stay valid, but the output is not cached.
+        """
+        key, result = self._cached(arms_config, query)
+        if result is not None:
+            yield from result.arms
+            return
+
+        parser = ArmStreamParser()
+        # Covers the whole stream, including the time the caller spends on each yielded arm
+        with metrics.timed("llm_score", mode="stream", model=self.model_name):
+            for chunk in (self.prompt | self.llm).stream({"topics": arms_config, "query": query}):
+                yield from parser.feed(chunk.content)
+            if not parser.done:
+                from langchain_core.exceptions import OutputParserException
+                raise OutputParserException("LLM output ended before the arms array was closed")
+            # Only a response that parses as a whole is worth caching
+            result = self.parser.parse(parser.buffer)
+        self._store(key, result)
+
+    async def ainvoke(self, arms_config: dict, query: str) -> ArmsConfig:
+        """Same as invoke(), without blocking the event loop while the LLM responds."""
+        key, result = self._cached(arms_config, query)
+        if result is None:
+            with metrics.timed("llm_score", mode="ainvoke", model=self.model_name):
+                result = await self.chain.ainvoke({"topics": arms_config, "query": query})
+            self._store(key, result)
+        return result
+
+
+class ArmStreamParser:
+    """
+    Incrementally extracts the objects of the top-level "arms" array from streamed JSON text.
 
-    # Create the chain (Prompt | LLM | Parser)
-    chain = prompt | llm | parser
+    Anything before the array (such as a ```json fence) is skipped. Each object is validated
+    as an ArmModel as soon as its closing brace arrives.
+    """
 
-    # Invoke the LLM with the arm configuration as input
-    return chain.invoke({"topics": arms_config, "query": query})
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0  # Next character to scan
+        self.in_array = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start = None  # Start of the object being scanned
+        self.done = False  # Set once the array is closed
+
+    def feed(self, text: str) -> List[ArmModel]:
+        """Adds streamed text and returns the arms completed by it."""
+        self.buffer += text
+        completed = []
+        if self.done:
+            return completed
+        if not self.in_array:
+            match = re.search(r'"arms"\s*:\s*\[', self.buffer)
+            if match is None:
+                return completed
+            self.in_array = True
+            self.position = match.end()
+
+        buffer = self.buffer
+        for i in range(self.position, len(buffer)):
+            char = buffer[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.start = i
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    completed.append(ArmModel.parse_raw(buffer[self.start:i + 1]))
+                    self.start = None
+            elif char == "]" and self.depth == 0:
+                self.done = True
+                break
+        self.position = len(buffer)
+        return completed
+
+
+# One scorer per model config
+_scorers: Dict[tuple, ArmScorer] = {}
+
+# Shared by all scorers, keyed by model name among other things
+response_cache = ArmScoreCache()
+
+
+def get_scorer(llm) -> ArmScorer:
+    """
+    Returns the shared ArmScorer for the LLM's model config, building it on first use.
+
+    Responses are only cached for temperature 0 models, whose answers are deterministic.
+    """
+    temperature = getattr(llm, "temperature", None)
+    key = (type(llm).__name__, getattr(llm, "model", None), temperature)
+    if key not in _scorers:
+        _scorers[key] = ArmScorer(llm, cache=response_cache if temperature == 0 else None)
+    return _scorers[key]
+
+
+# Function to update the scores using the LLM
+
+
+def update_arm_scores(llm, arms_config: dict, query: str):
+    return get_scorer(llm).invoke(arms_config, query)
+
+
+def stream_arm_scores(llm, arms_config: dict, query: str) -> Iterator[ArmModel]:
+    return get_scorer(llm).stream(arms_config, query)
+
+
+async def aupdate_arm_scores(llm, arms_config: dict, query: str):
+    return await get_scorer(llm).ainvoke(arms_config, query)
 # "A user has expressed interest in news about the football world cup and the NBA basketball and some NBA teams like the Lakers."
 
 
 # HOW TO USE:
 # updated_arms = update_arm_scores(llm, original_arms)
-# rec.update_arms(updated_arms.dict())
\ No newline at end of file
+# rec.update_arms(updated_arms.dict())
+
+
+def __getattr__(name: str):
+    # Keeps llm.ChatMistralAI working without importing langchain_mistralai with this module
+    if name == "ChatMistralAI":
+        from langchain_mistralai import ChatMistralAI
+        return ChatMistralAI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
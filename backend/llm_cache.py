@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from enum import Enum
+from typing import Optional
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "data", "llm_cache.sqlite")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _canonical(value):
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, float):
+        # Decayed scores carry float noise that should not split the cache
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (str, int, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def prompt_version(*parts: str) -> str:
+    """Returns a short hash of the prompt template and format instructions, for cache keys."""
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()[:16]
+
+
+class ArmScoreCache:
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = 10_000):
+        """
+        On-disk cache of LLM arm scoring responses, stored in SQLite.
+
+        Entries are keyed by a hash of the canonical arms config, the normalized query, the model
+        name and a version of the prompt, so edits to the prompt do not serve old responses, and
+        evicted least recently used first beyond `max_entries`. Only safe for
+        deterministic (temperature 0) models.
+
+        Args:
+            path (str): SQLite database file, created on first use.
+            max_entries (int): Maximum number of cached responses.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, last_used REAL)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        return self._conn
+
+    @staticmethod
+    def key(arms_config: dict, query: str, model: str, prompt: str = "") -> str:
+        """
+        Returns the cache key of a scoring request.
+
+        Args:
+            arms_config (dict): Arms config sent to the LLM.
+            query (str): User message.
+            model (str): Model name.
+            prompt (str): Identifies the prompt, e.g. from prompt_version().
+        """
+        payload = json.dumps(
+            {'arms': _canonical(arms_config), 'query': normalize_query(query), 'model': model, 'prompt': prompt},
+            sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response JSON for key, or None."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return row[0]
+
+    def set(self, key: str, response: str, model: str = None):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)", (key, model, response, now, now))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,170 @@
+import bisect
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# Upper bounds in seconds, from sub-millisecond bandit draws to slow LLM calls
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Latency histogram with fixed bucket bounds, in the layout Prometheus expects.
+
+        Args:
+            buckets (Tuple[float, ...]): Sorted upper bounds; larger values fall in an implicit +Inf bucket.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Returns the upper bound of the bucket holding the q-th quantile, 0.0 if empty."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Returns (le, count of values <= le) pairs, ending with +Inf."""
+        pairs, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            pairs.append((repr(bound), total))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+
+def _label_text(labels: tuple, extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Timed:
+    """Context manager returned by Metrics.timed()."""
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: tuple):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self.start
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.metrics._inc((self.name + "_errors_total", self.labels), 1)
+        self.metrics._observe((self.name + "_seconds", self.labels), seconds)
+        return False
+
+
+class Metrics:
+    def __init__(self):
+        """
+        In-process counters and latency histograms, keyed by metric name and labels.
+
+        Use timed() around a call to record its latency as `<name>_seconds` and its failures as
+        `<name>_errors_total`. render() returns everything in the Prometheus text format.
+        Labels are kept in the order they are passed, so each call site should pass them in a
+        fixed order.
+        """
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        self._inc((name, tuple(labels.items())), value)
+
+    def observe(self, name: str, seconds: float, **labels):
+        self._observe((name, tuple(labels.items())), seconds)
+
+    def timed(self, name: str, **labels) -> Timed:
+        """Records the block's duration in `<name>_seconds`, and `<name>_errors_total` if it raises."""
+        return Timed(self, name, tuple(labels.items()))
+
+    # These run on every sample, so they skip the keyword handling above
+    def _inc(self, key: tuple, value: float):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def _observe(self, key: tuple, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def summary(self) -> List[dict]:
+        """Returns one row per timed operation and label set, with latency percentiles and error rate."""
+        with self._lock:
+            rows = []
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                base = name[:-len("_seconds")] if name.endswith("_seconds") else name
+                errors = self.counters.get((f"{base}_errors_total", labels), 0)
+                rows.append({
+                    'operation': base,
+                    **dict(labels),
+                    'count': histogram.count,
+                    'mean_ms': histogram.sum / histogram.count * 1e3 if histogram.count else 0.0,
+                    'p50_ms': histogram.quantile(0.5) * 1e3,
+                    'p95_ms': histogram.quantile(0.95) * 1e3,
+                    'error_rate': errors / histogram.count if histogram.count else 0.0,
+                })
+            return rows
+
+    def counter_rows(self) -> List[dict]:
+        with self._lock:
+            return [{'counter': name, **dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())]
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_label_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                for le, count in histogram.cumulative():
+                    bucket_labels = _label_text(labels, f'le="{le}"')
+                    lines.append(f"{name}_bucket{bucket_labels} {count}")
+                lines.append(f"{name}_sum{_label_text(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by everything in the process
+metrics = Metrics()
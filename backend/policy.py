@@ -0,0 +1,150 @@
+import heapq
+import math
+import random
+from typing import Dict, List
+
+from backend.recsys import Arm, Bandit
+
+
+class Posterior:
+    __slots__ = ("successes", "failures")
+
+    def __init__(self, successes: float = 0.0, failures: float = 0.0):
+        """Feedback observed for one arm, as fractional Beta-Bernoulli counts."""
+        self.successes = successes
+        self.failures = failures
+
+
+class PolicyBandit(Bandit):
+    def __init__(self, arms: List[Arm] = [], alpha: float = 2.0, base_arms: List[Arm] = [],
+                 prior_weight: float = 4.0):
+        """
+        Base for bandits that learn from feedback events on top of the arms' scores.
+
+        Each arm has a Beta posterior over the chance that its items are liked. The prior mean is
+        the arm's score / 10, worth `prior_weight` observations, so scores set by the user or the
+        LLM still decide what is shown until feedback says otherwise. Feedback is kept per arm
+        name and survives score updates. Arms with score < 4 are never selected, as in Bandit.
+
+        Args:
+            arms (List[Arm]): List of Arm objects.
+            alpha (float): Kept for get_probabilities() and snapshots; selection does not use it.
+            base_arms (List[Arm]): Arms that are always available.
+            prior_weight (float): Number of observations the score counts for.
+        """
+        super().__init__(arms=arms, alpha=alpha, base_arms=base_arms)
+        self.prior_weight = prior_weight
+        self.posteriors: Dict[str, Posterior] = {}
+
+    def record_feedback(self, arm: Arm, reward: float):
+        """Adds one feedback event with a reward between 0 and 1 to the arm's posterior, in O(1)."""
+        posterior = self.posteriors.get(arm.name)
+        if posterior is None:
+            posterior = self.posteriors[arm.name] = Posterior()
+        posterior.successes += reward
+        posterior.failures += 1.0 - reward
+
+    def beta_params(self, arm: Arm) -> tuple:
+        """Returns the (a, b) parameters of the arm's Beta posterior."""
+        prior_mean = min(max(arm.score / 10, 0.01), 0.99)
+        a = self.prior_weight * prior_mean
+        b = self.prior_weight - a
+        posterior = self.posteriors.get(arm.name)
+        if posterior is not None:
+            a += posterior.successes
+            b += posterior.failures
+        return a, b
+
+    def expected_reward(self, arm: Arm) -> float:
+        a, b = self.beta_params(arm)
+        return a / (a + b)
+
+    def _valid_arms(self) -> List[Arm]:
+        valid_arms = [arm for arm in self.get_valid_arms() if arm.score >= 4]
+        if not valid_arms:
+            raise ValueError(
+                "No valid arms with score >= 4 available for selection.")
+        return valid_arms
+
+    def _indices(self, arms: List[Arm]) -> List[float]:
+        """Returns the selection index of each arm; the highest is pulled."""
+        raise NotImplementedError()
+
+    def select_arm(self) -> Arm:
+        valid_arms = self._valid_arms()
+        indices = self._indices(valid_arms)
+        return valid_arms[max(range(len(valid_arms)), key=indices.__getitem__)]
+
+    def select_arms(self, k: int) -> List[Arm]:
+        """Selects k arms (with replacement), each as select_arm would."""
+        return [self.select_arm() for _ in range(k)]
+
+    def select_distinct_arms(self, k: int) -> List[Arm]:
+        """Selects the up to k different arms with the highest indices."""
+        valid_arms = self._valid_arms()
+        if len(valid_arms) <= k:
+            return valid_arms
+        indices = self._indices(valid_arms)
+        return [valid_arms[i] for i in heapq.nlargest(k, range(len(valid_arms)), key=indices.__getitem__)]
+
+    def state(self) -> dict:
+        """Returns the learned feedback as plain data, for snapshots."""
+        return {name: [posterior.successes, posterior.failures] for name, posterior in self.posteriors.items()}
+
+    def load_state(self, state: dict):
+        self.posteriors = {name: Posterior(successes, failures) for name, (successes, failures) in state.items()}
+
+
+class ThompsonBandit(PolicyBandit):
+    """
+    Thompson sampling: draws a liking rate from each arm's posterior and pulls the best draw.
+
+    Arms with little feedback get varied draws and are still explored, arms with consistent
+    feedback are pulled about as often as they win.
+    """
+
+    def _indices(self, arms: List[Arm]) -> List[float]:
+        return [random.betavariate(*self.beta_params(arm)) for arm in arms]
+
+
+class UCBBandit(PolicyBandit):
+    def __init__(self, arms: List[Arm] = [], alpha: float = 2.0, base_arms: List[Arm] = [],
+                 prior_weight: float = 4.0, exploration: float = 0.5):
+        """
+        Upper confidence bound: pulls the arm with the best expected reward plus an exploration bonus.
+
+        The bonus shrinks with the arm's pulls, so arms shown less often than the others come
+        up again even without feedback.
+
+        Args:
+            arms (List[Arm]): List of Arm objects.
+            alpha (float): Kept for get_probabilities() and snapshots; selection does not use it.
+            base_arms (List[Arm]): Arms that are always available.
+            prior_weight (float): Number of observations the score counts for.
+            exploration (float): Weight of the exploration bonus.
+        """
+        super().__init__(arms=arms, alpha=alpha, base_arms=base_arms, prior_weight=prior_weight)
+        self.exploration = exploration
+
+    def _indices(self, arms: List[Arm], extra_pulls: Dict[str, int] = {}) -> List[float]:
+        pulls = [arm.pulls + extra_pulls.get(arm.name, 0) for arm in arms]
+        log_total = math.log(sum(pulls) + 1)
+        # Ties are broken randomly so equal arms are not always pulled in list order
+        return [self.expected_reward(arm) + self.exploration * math.sqrt(2 * log_total / (arm_pulls + 1))
+                + random.random() * 1e-9 for arm, arm_pulls in zip(arms, pulls)]
+
+    def select_arms(self, k: int) -> List[Arm]:
+        """Selects k arms (with replacement), counting each selection as a pull for the next."""
+        valid_arms = self._valid_arms()
+        extra_pulls: Dict[str, int] = {}
+        selected = []
+        for _ in range(k):
+            indices = self._indices(valid_arms, extra_pulls)
+            arm = valid_arms[max(range(len(valid_arms)), key=indices.__getitem__)]
+            extra_pulls[arm.name] = extra_pulls.get(arm.name, 0) + 1
+            selected.append(arm)
+        return selected
+
+
+# Feedback-driven bandits by class name, as stored in snapshots
+POLICIES = {cls.__name__: cls for cls in (ThompsonBandit, UCBBandit)}
@@ -0,0 +1,164 @@
+import threading
+import weakref
+from collections import deque
+from typing import Callable, Dict, List
+
+
+class RefillWorkers:
+    def __init__(self, workers: int = 8, poll_interval: float = 5.0):
+        """
+        Background threads refilling the prefetch pools of every recommender in the process.
+
+        A pool is queued once when it asks for a refill and stays queued until a worker takes it
+        up, so the number of threads does not grow with the number of recommenders. Workers that
+        find nothing to do for `poll_interval` seconds queue every live pool again, which retries
+        refills that failed. Pools are only referenced weakly, so they go away with their
+        Recommender.
+
+        Args:
+            workers (int): Number of worker threads, started on the first refill.
+            poll_interval (float): Seconds between retries of all pools when nothing asks for a refill.
+        """
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._pools = weakref.WeakSet()
+        self._queue = deque()  # Weak references to pools waiting for a worker
+        self._queued = weakref.WeakSet()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def request(self, pool: "PrefetchPool"):
+        """Queues a refill of the pool, unless one is already queued."""
+        with self._cond:
+            self._pools.add(pool)
+            if pool in self._queued:
+                return
+            self._queued.add(pool)
+            self._queue.append(weakref.ref(pool))
+            self._cond.notify()
+        self._start()
+
+    def _start(self):
+        if len(self._threads) >= self.workers:
+            return
+        with self._cond:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"prefetch-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue and not self._cond.wait(self.poll_interval):
+                    for pool in list(self._pools):
+                        if pool not in self._queued:
+                            self._queued.add(pool)
+                            self._queue.append(weakref.ref(pool))
+                if not self._queue:
+                    continue
+                pool = self._queue.popleft()()
+                if pool is None:
+                    continue
+                self._queued.discard(pool)
+            for arm in pool._needs_refill():
+                try:
+                    pool._refill(arm)
+                except Exception as e:
+                    print(f"Prefetch failed for arm {arm.name}: {e}")
+            del pool
+
+
+# Shared by every PrefetchPool in the process
+refill_workers = RefillWorkers()
+
+
+class PrefetchPool:
+    def __init__(self, fetch: Callable, low_watermark: int = 2, high_watermark: int = 6,
+                 workers: RefillWorkers = None):
+        """
+        Keeps a bounded pool of ready items per arm, refilled in the background.
+
+        Args:
+            fetch (Callable): Function taking an Arm and returning a freshly sampled Item.
+            low_watermark (int): Refill an arm's pool once it holds fewer items than this.
+            high_watermark (int): Stop refilling an arm's pool once it holds this many items.
+            workers (RefillWorkers): Threads doing the refills, the ones shared by all pools if None.
+        """
+        if not 0 < low_watermark <= high_watermark:
+            raise ValueError("Expected 0 < low_watermark <= high_watermark.")
+        self.fetch = fetch
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.workers = workers or refill_workers
+        self._pools: Dict[str, deque] = {}
+        self._arms = {}
+        self._lock = threading.Lock()
+
+    def watch(self, arm):
+        """Starts prefetching for an arm. Drops the arm's pool if its params or sampler changed."""
+        with self._lock:
+            known = self._arms.get(arm.name)
+            if known is None or known.params != arm.params or known.sampler_type != arm.sampler_type:
+                self._pools[arm.name] = deque(maxlen=self.high_watermark)
+            self._arms[arm.name] = arm
+        self.workers.request(self)
+
+    def forget(self, arm_name: str):
+        """Stops prefetching for an arm and drops its ready items."""
+        with self._lock:
+            self._arms.pop(arm_name, None)
+            self._pools.pop(arm_name, None)
+
+    def sync(self, arms: List):
+        """Watches exactly the given arms, forgetting any others."""
+        names = {arm.name for arm in arms}
+        for name in list(self._arms):
+            if name not in names:
+                self.forget(name)
+        for arm in arms:
+            self.watch(arm)
+
+    def pop(self, arm):
+        """
+        Returns a ready item for the arm, or None if its pool is empty.
+
+        Never touches the network; a refill is requested when the pool drops below the low watermark.
+        """
+        with self._lock:
+            pool = self._pools.get(arm.name)
+            item = pool.popleft() if pool else None
+            low = pool is None or len(pool) < self.low_watermark
+        if low:
+            self.workers.request(self)
+        return item
+
+    def put(self, arm, item):
+        """Adds an item fetched elsewhere to the arm's pool, if the arm is still watched and the pool has room."""
+        with self._lock:
+            pool = self._pools.get(arm.name)
+            if pool is not None and self._arms.get(arm.name) is arm and len(pool) < self.high_watermark:
+                pool.append(item)
+
+    def size(self, arm_name: str) -> int:
+        with self._lock:
+            return len(self._pools.get(arm_name, ()))
+
+    def _needs_refill(self):
+        """Returns the watched arms below the low watermark, emptiest pool first."""
+        with self._lock:
+            arms = [arm for name, arm in self._arms.items()
+                    if len(self._pools[name]) < self.low_watermark]
+            return sorted(arms, key=lambda arm: len(self._pools[arm.name]))
+
+    def _refill(self, arm):
+        while True:
+            with self._lock:
+                pool = self._pools.get(arm.name)
+                if pool is None or len(pool) >= self.high_watermark or self._arms.get(arm.name) is not arm:
+                    return
+            item = self.fetch(arm)
+            with self._lock:
+                # The arm may have been forgotten or reconfigured while we were fetching
+                if self._arms.get(arm.name) is arm:
+                    self._pools[arm.name].append(item)
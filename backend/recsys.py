@@ -1,14 +1,28 @@
+# Client libraries (gnews, arxiv, xkcd) and numpy are imported where they are first needed,
+# so that importing this module and building a Recommender stays cheap.
 import asyncio
-from tfl.client import Client as TFLClient
-from tfl.api_token import ApiToken
-import xkcd
-from typing import Dict, Union, List
-from gnews import GNews
+import functools
+import heapq
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Union, List
 import random
-import numpy as np
-from typing import List
 from enum import Enum
-import arxiv
+from backend.breaker import CircuitBreaker
+from backend.cache import TTLCache
+from backend.metrics import metrics
+from backend.prefetch import PrefetchPool
+from backend.seen import SeenSet
+from backend.sumtree import FenwickTree
+from backend.xkcd_mirror import XKCDMirror
+
+if TYPE_CHECKING:
+    # For annotations only, numpy is imported lazily at runtime
+    import numpy as np
 
 
 class SamplerType(Enum):
@@ -17,7 +31,40 @@ class SamplerType(Enum):
     ARXIV = 3
 
 
+# Maximum concurrent network calls per upstream API, shared by all samplers and prefetch threads
+# in the process. arXiv asks clients to keep to a single connection.
+UPSTREAM_CONCURRENCY = {SamplerType.GNEWS: 4, SamplerType.XKCD: 4, SamplerType.ARXIV: 1}
+upstream_limits = {sampler_type: threading.BoundedSemaphore(limit)
+                   for sampler_type, limit in UPSTREAM_CONCURRENCY.items()}
+# Worker threads for fetches waited on with a deadline and for background refreshes, one pool
+# per upstream sized to its limit, so an upstream that hangs only holds up its own fetches
+fetch_executors = {sampler_type: ThreadPoolExecutor(max_workers=limit,
+                                                    thread_name_prefix=f"fetch-{sampler_type.name.lower()}")
+                   for sampler_type, limit in UPSTREAM_CONCURRENCY.items()}
+# Seconds a single network operation of an upstream client may block
+UPSTREAM_TIMEOUT = 20.0
+
+# Seconds Recommender.sample() waits for a fetch before falling back to the arm's last item.
+# A fetch slower than this also counts as a failure of its upstream.
+SAMPLER_DEADLINES = {SamplerType.GNEWS: 5.0, SamplerType.XKCD: 3.0, SamplerType.ARXIV: 10.0}
+# One breaker per upstream API, shared like upstream_limits
+breakers = {sampler_type: CircuitBreaker(failure_threshold=5, cooldown=30.0) for sampler_type in SamplerType}
+
+
+def to_sampler_type(value) -> SamplerType:
+    """Accepts a SamplerType or its name, as found in get_arms() output and LLM responses."""
+    return value if isinstance(value, SamplerType) else SamplerType[value]
+
+
+def intern(value):
+    """Interns repeated string fields (publishers, senders, dates) so items share one copy."""
+    return sys.intern(value) if type(value) is str else value
+
+
 class Item:
+    # Items are created by the hundred thousand and never gain new attributes, so skip the per-instance __dict__
+    __slots__ = ("sample_result",)
+
     def __init__(self, sample_result: dict):
         self.sample_result = sample_result
 
@@ -27,10 +74,22 @@ class Item:
     def __repr__(self):
         return f"Item(sample_result={self.sample_result})"
 
+    @property
+    def key(self) -> Optional[str]:
+        """Identifies the underlying content (URL, arXiv id, comic number), None for chat messages."""
+        return None
+
+    def fields(self) -> dict:
+        """Returns the item's attributes, the slots equivalent of vars(item)."""
+        return {name: getattr(self, name) for cls in type(self).__mro__
+                for name in getattr(cls, "__slots__", ()) if hasattr(self, name)}
+
 
 class ChatItem(Item):
+    __slots__ = ("sender", "message")
+
     def __init__(self, sample_result: dict):
-        self.sender = sample_result.get("sender", "Unknown sender")
+        self.sender = intern(sample_result.get("sender", "Unknown sender"))
         self.message = sample_result.get("message", "no message")
 
     def __str__(self):
@@ -38,15 +97,21 @@ class ChatItem(Item):
 
 
 class GNewsItem(Item):
+    __slots__ = ("title", "description", "date", "publisher_name", "url")
+
     def __init__(self, sample_result: dict = {}):
         self.title = sample_result.get("title", "An untitled article")
         self.description = sample_result.get(
             "description", "No description available")
-        self.date = sample_result.get("published date", "an unknown date")
-        self.publisher_name = sample_result.get(
-            "publisher", {}).get("title", "an unknown publisher")
+        self.date = intern(sample_result.get("published date", "an unknown date"))
+        self.publisher_name = intern(sample_result.get(
+            "publisher", {}).get("title", "an unknown publisher"))
         self.url = sample_result.get("url", "No url available")
 
+    @property
+    def key(self):
+        return self.url
+
     def __str__(self):
         return (
             f"'{self.title}', published by {self.publisher_name} on {
@@ -55,6 +120,8 @@ class GNewsItem(Item):
 
 
 class XKCDItem(Item):
+    __slots__ = ("number", "title", "alt_text", "image_link", "image_name", "link")
+
     def __init__(self, sample_result: dict = {}):
         self.number = sample_result.get("number", "an unknown number")
         self.title = sample_result.get("title", "An untitled comic")
@@ -64,6 +131,10 @@ class XKCDItem(Item):
             "imageName", "No image name available")
         self.link = sample_result.get("link", "No link available")
 
+    @property
+    def key(self):
+        return f"xkcd:{self.number}"
+
     def __str__(self):
         return (
             f"XKCD comic #{self.number}, titled '{
@@ -74,17 +145,23 @@ class XKCDItem(Item):
         )
 
 
-class ArxivItem:
+class ArxivItem(Item):
+    __slots__ = ("title", "authors", "summary", "published", "pdf_url", "arxiv_url")
+
     def __init__(self, paper):
         self.title = paper.title or "Untitled paper"
         self.authors = ", ".join(
             [author.name for author in paper.authors]) or "Unknown authors"
         self.summary = paper.summary or "No summary available"
-        self.published = paper.published.strftime(
-            "%B %d, %Y") if paper.published else "Unknown publication date"
+        self.published = intern(paper.published.strftime(
+            "%B %d, %Y")) if paper.published else "Unknown publication date"
         self.pdf_url = paper.pdf_url or "No PDF available"
         self.arxiv_url = paper.entry_id or "No arXiv URL available"
 
+    @property
+    def key(self):
+        return self.arxiv_url
+
     def __str__(self):
         return (
             f"'{self.title}' was authored by {
@@ -95,80 +172,353 @@ class ArxivItem:
         )
 
 
+def draw_unseen(candidates: list, key: Callable, seen: SeenSet = None, attempts: int = 8,
+                cum_weights: List[float] = None):
+    """
+    Draws a random candidate, redrawing up to `attempts` times while its key is in `seen`.
+
+    Draws are uniform, or weighted by `cum_weights` as in random.choices. Falls back to the
+    last draw if every attempt hit a seen item.
+    """
+    if cum_weights is not None:
+        draws = random.choices(candidates, cum_weights=cum_weights, k=attempts)
+    else:
+        draws = (random.choice(candidates) for _ in range(attempts))
+    for candidate in draws:
+        if seen is None or key(candidate) not in seen:
+            break
+    return candidate
+
+
+class SamplerError(Exception):
+    """Raised when a sampler has no item to return, or its upstream is unavailable."""
+
+
+def _upstream_failed(sampler_type: SamplerType):
+    if breakers[sampler_type].record_failure():
+        metrics.inc("recsys_breaker_opened_total", sampler=sampler_type.name)
+        print(f"{sampler_type.name} is failing, not calling it for {breakers[sampler_type].cooldown:.0f}s")
+
+
+def _upstream_ok(sampler_type: SamplerType):
+    if breakers[sampler_type].record_success():
+        metrics.inc("recsys_breaker_closed_total", sampler=sampler_type.name)
+
+
+def call_upstream(sampler_type: SamplerType, call: Callable):
+    """
+    Makes one network call to an upstream API, within its concurrency limit and circuit breaker.
+
+    Failures count towards opening the breaker and a call within the upstream's deadline closes
+    it. A slower call counts as neither; the caller waiting on it counts the timeout.
+
+    Raises:
+        SamplerError: If the breaker is open.
+    """
+    breaker = breakers[sampler_type]
+    if not breaker.allow():
+        metrics.inc("recsys_upstream_calls_total", sampler=sampler_type.name, outcome="rejected")
+        raise SamplerError(f"{sampler_type.name} is unavailable, retrying in {breaker.retry_in():.0f}s")
+    with upstream_limits[sampler_type]:
+        start = time.perf_counter()
+        try:
+            result = call()
+        except Exception:
+            _upstream_failed(sampler_type)
+            metrics.inc("recsys_upstream_calls_total", sampler=sampler_type.name, outcome="error")
+            raise
+        seconds = time.perf_counter() - start
+    if seconds <= SAMPLER_DEADLINES[sampler_type]:
+        _upstream_ok(sampler_type)
+    metrics.inc("recsys_upstream_calls_total", sampler=sampler_type.name, outcome="ok")
+    return result
+
+
+def set_socket_timeout():
+    # gnews (through feedparser) and xkcd use urllib without a timeout argument, so their calls
+    # can only be bounded through the default of new sockets
+    if socket.getdefaulttimeout() is None:
+        socket.setdefaulttimeout(UPSTREAM_TIMEOUT)
+
+
 class Sampler:
     def __init__(self):
         raise NotImplementedError()
 
-    def sample(self, params: Dict[str, Union[str, float]] = {}):
+    def sample(self, params: Dict[str, Union[str, float]] = {}, seen: SeenSet = None):
         """
         Sample function that processes the input parameter string and interacts with the API.
 
         Parameters:
         params (Dict): Dict with arguments
+        seen (SeenSet): Keys of items the user already received, avoided when drawing
 
         Returns:
         dict: A dictionary containing the response from the API.
         """
         raise NotImplementedError()
 
+    def sample_cached(self, params: Dict[str, Union[str, float]] = {}, seen: SeenSet = None) -> Optional[Item]:
+        """
+        Like sample, but only draws from data the sampler already holds, without calling the API.
+
+        Returns None if there is nothing to draw from.
+        """
+        return None
+
+
+# Feed fetches shared by every GNewsSampler in the process, keyed by (query, max_results).
+# An expired feed is still drawn from for up to an hour while GNews is failing.
+gnews_cache = TTLCache(max_entries=256, ttl=600, max_stale=3600)
+
 
 class GNewsSampler(Sampler):
-    def __init__(self, max_results=50):
+    def __init__(self, max_results=50, cache: TTLCache = gnews_cache, rank: bool = True):
+        """
+        Args:
+            max_results (int): Articles fetched per query.
+            cache (TTLCache): Feed cache, shared between samplers by default; None to always fetch.
+            rank (bool): Favour the articles whose text best matches the query when drawing.
+        """
         # Instantiate the Google News client once
+        self.max_results = max_results
+        from gnews import GNews
         self.google_news = GNews(max_results=max_results)
+        set_socket_timeout()
+        self.cache = cache
+        self.ranker = None
+        if rank:
+            from backend.relevance import shared_ranker
+            self.ranker = shared_ranker()
+
+    def fetch(self, query: str) -> List[dict]:
+        """
+        Get the news feed for a query from the shared cache.
 
-    def sample(self, params: Dict[str, Union[str, float]] = {'query': 'World News'}):
+        An expired feed is served while it is reloaded in the background, so only the first
+        fetch of a query waits on GNews.
+        """
+        def get_news():
+            news = self.google_news.get_news(query)
+            if not news:
+                # gnews reports network errors as an empty feed
+                raise SamplerError(f"No GNews articles found for: {query}")
+            return news
+
+        def load():
+            return call_upstream(SamplerType.GNEWS, get_news)
+
+        if self.cache is None:
+            return load()
+        return self.cache.get_or_load((query, self.max_results), load, refresh=fetch_executors[SamplerType.GNEWS])
+
+    def sample(self, params: Dict[str, Union[str, float]] = {'query': 'World News'}, seen: SeenSet = None):
         """
         Get news articles based on the 'query' parameter from the params dictionary.
         """
         query = params.get('query', '')
-        news = self.google_news.get_news(query)
+        return self._draw(query, self.fetch(query), seen)
 
-        if news:
-            return GNewsItem(random.choice(news))
-        else:
-            raise Exception("No GNews articles found.")
+    def sample_cached(self, params: Dict[str, Union[str, float]] = {'query': 'World News'}, seen: SeenSet = None):
+        """Draws from the query's cached feed, even an expired one, or returns None if there is none."""
+        query = params.get('query', '')
+        news = self.cache.peek((query, self.max_results)) if self.cache is not None else None
+        return self._draw(query, news, seen) if news else None
+
+    def _draw(self, query: str, news: List[dict], seen: SeenSet = None) -> GNewsItem:
+        cum_weights = None
+        if self.ranker is not None and query:
+            cum_weights = self.ranker.cum_weights(
+                ("gnews", query, self.max_results), news, lambda article: article.get("url"),
+                lambda article: f"{article.get('title', '')} {article.get('description', '')}", query)
+        return GNewsItem(draw_unseen(news, lambda article: article.get("url"), seen, cum_weights=cum_weights))
 
 
 class XKCDSampler(Sampler):
-    def __init__(self):
-        pass  # No need for an API key
+    def __init__(self, mirror: XKCDMirror = None, sync_interval: float = 86400, sync_batch: int = 20):
+        """
+        Draws comics from the local mirror once it holds the whole archive, and from the XKCD API
+        until then.
 
-    def sample(self, params: Dict[str, Union[str, float]] = {}):
+        The mirror is synced in a background thread, in batches of `sync_batch` comics, when the
+        sampler is first used and every `sync_interval` seconds after that. The full archive can
+        also be fetched ahead of time with `python -m backend.xkcd_mirror`.
+
+        Args:
+            mirror (XKCDMirror): Local metadata store to draw from; a default one is used if None.
+            sync_interval (float): Seconds between incremental syncs of the mirror.
+            sync_batch (int): Maximum number of comics fetched per upstream call.
+        """
+        # No need for an API key
+        self.mirror = mirror if mirror is not None else XKCDMirror()
+        set_socket_timeout()
+        self.sync_interval = sync_interval
+        self.sync_batch = sync_batch
+        self.sync_due = 0.0
+        self.complete = False  # Set once the mirror has caught up with the latest comic
+        self._syncing = False
+        self._sync_lock = threading.Lock()
+
+    def _start_sync(self):
+        with self._sync_lock:
+            if self._syncing:
+                return
+            self._syncing = True
+        threading.Thread(target=self._sync, name="xkcd-sync", daemon=True).start()
+
+    def _sync(self):
+        try:
+            while call_upstream(SamplerType.XKCD,
+                                lambda: self.mirror.sync(max_fetch=self.sync_batch)) >= self.sync_batch:
+                pass
+            self.complete = True
+            self.sync_due = time.monotonic() + self.sync_interval
+        except Exception as e:
+            # Carry on from the last stored comic once the upstream may be back
+            self.sync_due = time.monotonic() + breakers[SamplerType.XKCD].cooldown
+            print(f"XKCD mirror sync failed: {e}")
+        finally:
+            self._syncing = False
+
+    def sample(self, params: Dict[str, Union[str, float]] = {}, seen: SeenSet = None):
         """
         Get a random XKCD comic. The 'params' dictionary is ignored as no parameters are required.
         """
-        comic = xkcd.getRandomComic()
-        return XKCDItem(vars(comic))  # Return the comic data
+        if time.monotonic() >= self.sync_due:
+            self._start_sync()
+        item = self.sample_cached(params, seen)
+        if item is None:
+            # A partial mirror only holds the oldest comics, draw from the whole archive instead
+            import xkcd
+            item = XKCDItem(vars(call_upstream(SamplerType.XKCD, xkcd.getRandomComic)))
+        return item
+
+    def sample_cached(self, params: Dict[str, Union[str, float]] = {}, seen: SeenSet = None):
+        """Draws from the mirror once it is complete, or returns None."""
+        if not self.complete:
+            return None
+        for _ in range(8):
+            comic = self.mirror.random()
+            if comic is None or seen is None or f"xkcd:{comic['number']}" not in seen:
+                break
+        return XKCDItem(comic) if comic is not None else None
+
+
+class ArxivCorpus:
+    def __init__(self, max_papers: int = 500):
+        """
+        Papers collected for one topic, oldest first, plus the newest publication time seen.
+
+        Args:
+            max_papers (int): Maximum number of papers kept; the oldest ones are dropped first.
+        """
+        self.max_papers = max_papers
+        self.papers = []
+        self.entry_ids = set()
+        self.watermark = None  # Newest `published` timestamp in the corpus
+        self.refreshed_at = 0.0
+
+    def add(self, new_papers: list):
+        """Adds papers given newest first, as returned by a SubmittedDate search."""
+        for paper in reversed(new_papers):
+            if paper.entry_id in self.entry_ids:
+                continue
+            self.papers.append(paper)
+            self.entry_ids.add(paper.entry_id)
+            if self.watermark is None or paper.published > self.watermark:
+                self.watermark = paper.published
+        overflow = len(self.papers) - self.max_papers
+        if overflow > 0:
+            for paper in self.papers[:overflow]:
+                self.entry_ids.discard(paper.entry_id)
+            del self.papers[:overflow]
 
 
 class ArxivSampler(Sampler):
-    def __init__(self):
+    def __init__(self, refresh_interval: float = 900, page_size: int = 25, max_results: int = 100,
+                 rank: bool = True):
+        """
+        Args:
+            refresh_interval (float): Seconds between delta fetches for a topic.
+            page_size (int): Papers requested per API page, so a refresh stops after a few new entries.
+            max_results (int): Maximum number of papers fetched by a single refresh.
+            rank (bool): Favour the papers whose title and abstract best match the topic when drawing.
+        """
         # Initialize the arxiv client
-        self.client = arxiv.Client()
-
-    def sample(self, params: Dict[str, Union[str, float]] = {}):
+        import arxiv
+        self.client = arxiv.Client(page_size=page_size)
+        # The client sends its requests without a timeout
+        self.client._session.request = functools.partial(self.client._session.request, timeout=UPSTREAM_TIMEOUT)
+        self.refresh_interval = refresh_interval
+        self.max_results = max_results
+        self.corpora: Dict[str, ArxivCorpus] = {}
+        self._lock = threading.Lock()
+        self.ranker = None
+        if rank:
+            from backend.relevance import shared_ranker
+            self.ranker = shared_ranker()
+
+    def refresh(self, topic: str) -> ArxivCorpus:
         """
-        Get a random paper from Arxiv. The params has the topic of interest as 'topic'.
+        Fetch the papers submitted since the topic's watermark and add them to its corpus.
+
+        Results come newest first, so paging stops at the first paper that is not newer
+        than the watermark.
         """
-        # Extract the topic from params, default to "artificial intelligence" if not provided
-        topic = params.get('topic', 'artificial intelligence')
+        with self._lock:
+            corpus = self.corpora.setdefault(topic, ArxivCorpus())
 
-        # Define the search query for Arxiv
+        import arxiv
         search = arxiv.Search(
             query=topic,
-            max_results=100,  # Fetch up to 100 papers to allow for random sampling
+            max_results=self.max_results,
             sort_by=arxiv.SortCriterion.SubmittedDate
         )
+        def fetch_new_papers():
+            new_papers = []
+            for paper in self.client.results(search):
+                if corpus.watermark is not None and paper.published <= corpus.watermark:
+                    break
+                new_papers.append(paper)
+            return new_papers
+
+        new_papers = call_upstream(SamplerType.ARXIV, fetch_new_papers)
+
+        with self._lock:
+            corpus.add(new_papers)
+            corpus.refreshed_at = time.monotonic()
+        return corpus
+
+    def sample(self, params: Dict[str, Union[str, float]] = {}, seen: SeenSet = None):
+        """
+        Get a random paper from Arxiv. The params has the topic of interest as 'topic'.
+        """
+        # Extract the topic from params, default to "artificial intelligence" if not provided
+        topic = params.get('topic', 'artificial intelligence')
 
-        # Get all results from the search
-        all_results = list(self.client.results(search))
+        corpus = self.corpora.get(topic)
+        if corpus is None or time.monotonic() - corpus.refreshed_at > self.refresh_interval:
+            corpus = self.refresh(topic)
 
-        if not all_results:
-            return f"No papers found for the topic: {topic}"
+        if not corpus.papers:
+            raise SamplerError(f"No papers found for the topic: {topic}")
+        return self._draw(topic, corpus, seen)
 
-        # Select a random paper from the search results
-        random_paper = random.choice(all_results)
+    def sample_cached(self, params: Dict[str, Union[str, float]] = {}, seen: SeenSet = None):
+        """Draws from the topic's corpus as collected so far, or returns None if it is empty."""
+        topic = params.get('topic', 'artificial intelligence')
+        corpus = self.corpora.get(topic)
+        return self._draw(topic, corpus, seen) if corpus is not None and corpus.papers else None
+
+    def _draw(self, topic: str, corpus: ArxivCorpus, seen: SeenSet = None) -> ArxivItem:
+        # Select a random paper from the accumulated corpus, favouring the closest matches
+        with self._lock:
+            cum_weights = None
+            if self.ranker is not None:
+                cum_weights = self.ranker.cum_weights(
+                    ("arxiv", topic), corpus.papers, lambda paper: paper.entry_id,
+                    lambda paper: f"{paper.title} {paper.summary}", topic)
+            random_paper = draw_unseen(corpus.papers, lambda paper: paper.entry_id, seen, cum_weights=cum_weights)
 
         # Return an ArxivItem
         return ArxivItem(random_paper)
@@ -202,6 +552,10 @@ class Arm:
         return f"Arm {self.name} has score {self.score:.2f} and has been pulled {self.pulls} times"
 
 
+# Reward of each feedback event on a served item, between 0 (not wanted) and 1
+FEEDBACK_REWARDS = {'upvote': 1.0, 'click': 1.0, 'downvote': 0.0}
+
+
 class Bandit:
     def __init__(self, arms: List[Arm] = [], alpha: float = 2.0, base_arms: List[Arm] = []):
         """
@@ -211,8 +565,8 @@ class Bandit:
             arms (List[Arm]): List of Arm objects.
             alpha (float): Exponential scaling factor for sampling probabilities.
         """
-        self.arms = arms  # A list of Arm objects
-        self.base_arms = base_arms
+        self.arms = list(arms)  # A list of Arm objects
+        self.base_arms = list(base_arms)
         self.alpha = alpha  # Scaling factor for exponential distribution
 
     def get_valid_arms(self):
@@ -244,38 +598,597 @@ class Bandit:
             valid_arms, weights=probabilities, k=1)[0]
         return selected_arm
 
+    def select_arms(self, k: int) -> List[Arm]:
+        """Selects k arms (with replacement) based on the exponential distribution of the scores."""
+        valid_arms = [arm for arm in self.get_valid_arms() if arm.score >= 4]
+
+        if not valid_arms:
+            raise ValueError(
+                "No valid arms with score >= 4 available for selection.")
+
+        return random.choices(valid_arms, weights=self.get_probabilities(), k=k)
+
+    def select_distinct_arms(self, k: int) -> List[Arm]:
+        """
+        Selects up to k different arms, each draw weighted like select_arm among the arms not yet drawn.
+
+        Uses weighted random keys (random() ** (1 / weight)), keeping the k largest.
+        """
+        valid_arms = [arm for arm in self.get_valid_arms() if arm.score >= 4]
+
+        if not valid_arms:
+            raise ValueError(
+                "No valid arms with score >= 4 available for selection.")
+        if len(valid_arms) <= k:
+            return valid_arms
+
+        keyed = ((random.random() ** (1 / weight), i) for i, weight in enumerate(self.get_probabilities()))
+        return [valid_arms[i] for _, i in heapq.nlargest(k, keyed)]
+
     def pull_and_decay(self, arm: Arm):
         """Pulls the arm and applies the decay towards 5."""
         arm.sample_arm()
 
+    def decay_batch(self, arms: List[Arm]):
+        """Pulls every arm in the list (once per occurrence) and applies the decay towards 5."""
+        for arm in arms:
+            self.pull_and_decay(arm)
+
+    def invalidate(self):
+        """Signals that arms were edited in place. The list-based bandit reads them directly."""
+        pass
+
+    def arm_changed(self, arm: Arm):
+        """Signals that one arm's score was edited in place."""
+        self.invalidate()
+
+    def record_feedback(self, arm: Arm, reward: float):
+        """
+        Learns from a feedback event on an item of the arm, with a reward between 0 and 1.
+
+        Score-based bandits only change through scores, so this does nothing here; the
+        bandits in backend.policy learn from it.
+        """
+        pass
+
+
+class IndexedBandit(Bandit):
+    """
+    Base for bandits that keep a derived index over their arms.
+
+    Assigning `arms` or `base_arms` marks the index stale; subclasses rebuild it in refresh().
+    """
+
+    @property
+    def arms(self) -> List[Arm]:
+        return self._arms
+
+    @arms.setter
+    def arms(self, arms: List[Arm]):
+        self._arms = list(arms)
+        self._stale = True
+
+    @property
+    def base_arms(self) -> List[Arm]:
+        return self._base_arms
+
+    @base_arms.setter
+    def base_arms(self, arms: List[Arm]):
+        self._base_arms = list(arms)
+        self._stale = True
+
+    def invalidate(self):
+        self._stale = True
+
+    def refresh(self):
+        raise NotImplementedError()
+
+
+class ArrayBandit(IndexedBandit):
+    def __init__(self, arms: List[Arm] = [], alpha: float = 2.0, base_arms: List[Arm] = [], seed=None):
+        """
+        Bandit that keeps scores, pulls and decay rates in contiguous NumPy arrays.
+
+        The Arm objects stay the source of truth for configuration: assigning `arms` or
+        `base_arms` (or calling refresh()) rebuilds the arrays, and pulls made through
+        pull_and_decay()/decay_batch() are written back to the pulled Arm objects.
+
+        Args:
+            arms (List[Arm]): List of Arm objects.
+            alpha (float): Exponential scaling factor for sampling probabilities.
+            base_arms (List[Arm]): Arms that are always available.
+            seed: Seed for the NumPy random generator.
+        """
+        self._arms = list(arms)
+        self._base_arms = list(base_arms)
+        self.alpha = alpha
+        import numpy as np
+        self.rng = np.random.default_rng(seed)
+        self._stale = True
+
+    def refresh(self):
+        """Rebuilds the arrays from the Arm objects, e.g. after editing an arm's score in place."""
+        self._all_arms = self._arms + self._base_arms
+        import numpy as np
+        self._positions = {id(arm): i for i, arm in enumerate(self._all_arms)}
+        self.scores = np.array([arm.score for arm in self._all_arms], dtype=np.float64)
+        self.pulls = np.array([arm.pulls for arm in self._all_arms], dtype=np.int64)
+        self.decay_rates = np.array([arm.decay_rate for arm in self._all_arms], dtype=np.float64)
+        self._stale = False
+
+    def _weights(self) -> "np.ndarray":
+        import numpy as np
+        if self._stale:
+            self.refresh()
+        # Arms with scores less than 4 get zero weight
+        return np.where(self.scores >= 4, self.scores ** self.alpha, 0.0)
+
+    def get_probabilities(self) -> List[float]:
+        """Calculates the probabilities of the arms with score >= 4, in get_valid_arms() order."""
+        weights = self._weights()
+        valid = weights[self.scores >= 4]
+        if not valid.size:
+            raise ValueError("No arms with score >= 4 to sample from.")
+        return (valid / valid.sum()).tolist()
+
+    def select_indices(self, k: int) -> "np.ndarray":
+        """Draws k arm positions (with replacement) in one vectorized call."""
+        import numpy as np
+        cumulative = np.cumsum(self._weights())
+        if not cumulative.size or cumulative[-1] <= 0:
+            raise ValueError(
+                "No valid arms with score >= 4 available for selection.")
+        draws = self.rng.random(k) * cumulative[-1]
+        return np.searchsorted(cumulative, draws, side='right')
+
+    def select_arms(self, k: int) -> List[Arm]:
+        return [self._all_arms[i] for i in self.select_indices(k)]
+
+    def select_arm(self) -> Arm:
+        return self.select_arms(1)[0]
+
+    def decay_indices(self, indices: "np.ndarray"):
+        """
+        Applies one pull per occurrence of each position in a single vectorized update.
+
+        m pulls of an arm decay its score to 5 + (score - 5) * (1 - decay_rate) ** m.
+        """
+        import numpy as np
+        if self._stale:
+            self.refresh()
+        counts = np.bincount(indices, minlength=len(self._all_arms))
+        touched = np.nonzero(counts)[0]
+        self.scores[touched] = 5 + (self.scores[touched] - 5) * \
+            (1 - self.decay_rates[touched]) ** counts[touched]
+        self.pulls[touched] += counts[touched]
+        for i in touched:
+            arm = self._all_arms[i]
+            arm.score = float(self.scores[i])
+            arm.pulls = int(self.pulls[i])
+
+    def arm_changed(self, arm: Arm):
+        if self._stale:
+            return
+        position = self._positions[id(arm)]
+        self.scores[position] = arm.score
+        self.decay_rates[position] = arm.decay_rate
+
+    def decay_batch(self, arms: List[Arm]):
+        import numpy as np
+        if self._stale:
+            self.refresh()
+        self.decay_indices(np.array([self._positions[id(arm)] for arm in arms], dtype=np.int64))
+
+    def pull_and_decay(self, arm: Arm):
+        self.decay_batch([arm])
+
+
+class SumTreeBandit(IndexedBandit):
+    def __init__(self, arms: List[Arm] = [], alpha: float = 2.0, base_arms: List[Arm] = []):
+        """
+        Bandit that keeps `score ** alpha` weights in a Fenwick tree.
+
+        Draws and single-arm pulls are O(log n) instead of O(n). Arms with score < 4 are
+        masked to weight zero. Assigning `arms` or `base_arms` (or calling refresh())
+        rebuilds the tree in O(n).
+
+        Args:
+            arms (List[Arm]): List of Arm objects.
+            alpha (float): Exponential scaling factor for sampling probabilities.
+            base_arms (List[Arm]): Arms that are always available.
+        """
+        self._arms = list(arms)
+        self._base_arms = list(base_arms)
+        self.alpha = alpha
+        self._stale = True
+
+    def _weight(self, arm: Arm) -> float:
+        return arm.score ** self.alpha if arm.score >= 4 else 0.0
+
+    def refresh(self):
+        """Rebuilds the tree from the Arm objects, e.g. after editing an arm's score in place."""
+        self._all_arms = self._arms + self._base_arms
+        self._positions = {id(arm): i for i, arm in enumerate(self._all_arms)}
+        self.tree = FenwickTree([self._weight(arm) for arm in self._all_arms])
+        self._stale = False
+
+    def update_arm(self, arm: Arm):
+        """Re-reads one arm's score into the tree in O(log n)."""
+        if self._stale:
+            self.refresh()
+        self.tree.set(self._positions[id(arm)], self._weight(arm))
+
+    def arm_changed(self, arm: Arm):
+        self.update_arm(arm)
+
+    def select_arm(self) -> Arm:
+        if self._stale:
+            self.refresh()
+        total = self.tree.total()
+        if total <= 0:
+            raise ValueError(
+                "No valid arms with score >= 4 available for selection.")
+        return self._all_arms[self.tree.find(random.random() * total)]
+
+    def select_arms(self, k: int) -> List[Arm]:
+        return [self.select_arm() for _ in range(k)]
+
+    def pull_and_decay(self, arm: Arm):
+        arm.sample_arm()
+        self.update_arm(arm)
+
+
+# Sampler class per type, instantiated on first use of the type
+SAMPLER_CLASSES = {
+    SamplerType.GNEWS: GNewsSampler,
+    SamplerType.XKCD: XKCDSampler,
+    SamplerType.ARXIV: ArxivSampler,
+}
+
+
+class LazySamplers(dict):
+    """Dict of SamplerType -> Sampler that builds each sampler the first time its type is looked up."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def __missing__(self, sampler_type: SamplerType) -> Sampler:
+        with self._lock:
+            if sampler_type not in self:
+                self[sampler_type] = SAMPLER_CLASSES[sampler_type]()
+            return dict.__getitem__(self, sampler_type)
+
+
+class ArmChanges:
+    def __init__(self):
+        """
+        What an update did to the recommender's arms.
+
+        Attributes:
+            added (List[str]): Names of new arms.
+            removed (List[str]): Names of dropped arms.
+            changed (Dict[str, dict]): Per changed arm, {field: (old value, new value)}.
+        """
+        self.added: List[str] = []
+        self.removed: List[str] = []
+        self.changed: Dict[str, dict] = {}
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def merge(self, later: "ArmChanges") -> "ArmChanges":
+        """Folds in the changes of a later update, keeping each field's earliest old value."""
+        for name in later.added:
+            if name not in self.added:
+                self.added.append(name)
+        for name in later.removed:
+            if name in self.added:
+                self.added.remove(name)
+            else:
+                self.removed.append(name)
+            self.changed.pop(name, None)
+        for name, fields in later.changed.items():
+            if name in self.added:
+                continue
+            merged = self.changed.setdefault(name, {})
+            for field, (old, new) in fields.items():
+                old = merged[field][0] if field in merged else old
+                if old == new:
+                    merged.pop(field, None)
+                else:
+                    merged[field] = (old, new)
+            if not merged:
+                del self.changed[name]
+        return self
+
+    def to_dict(self) -> dict:
+        """Returns the changes as plain JSON-compatible values, with sampler types by name."""
+        def plain(value):
+            return value.name if isinstance(value, Enum) else value
+
+        return {'added': self.added, 'removed': self.removed,
+                'changed': {name: {field: [plain(old), plain(new)] for field, (old, new) in fields.items()}
+                            for name, fields in self.changed.items()}}
+
+    def __str__(self):
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed"
+
+
+def parse_arm_config(arm_config: dict) -> tuple:
+    """Validates one entry of an arms config and returns (name, params, sampler_type, score)."""
+    return (arm_config['name'], arm_config['params'], to_sampler_type(arm_config['sampler_type']),
+            float(arm_config['score']))
+
+
+# Served items remembered per recommender, to attribute feedback to their arm
+MAX_SERVED = 1000
+
 
 class Recommender:
-    def __init__(self, base_arms=List[Arm]):
-        self.bandit = Bandit(base_arms=base_arms)
-        self.samplers = {
-            SamplerType.GNEWS: GNewsSampler(),
-            SamplerType.XKCD: XKCDSampler(),
-            SamplerType.ARXIV: ArxivSampler(),
-        }
+    def __init__(self, base_arms=List[Arm], prefetch: bool = False, bandit_cls: type = Bandit,
+                 samplers: Dict[SamplerType, Sampler] = None, deadlines: Dict[SamplerType, float] = None):
+        """
+        Args:
+            base_arms (List[Arm]): Arms that are always available to the bandit.
+            prefetch (bool): Keep a pool of ready items per arm, refilled in the background,
+                so that sample() does not wait on the network.
+            bandit_cls (type): Selection strategy, Bandit or one of its subclasses such as ArrayBandit,
+                or a feedback-driven one from backend.policy.
+            samplers (Dict[SamplerType, Sampler]): Samplers to use, e.g. shared between recommenders.
+                If None, each sampler is created on first use of its type.
+            deadlines (Dict[SamplerType, float]): Per-sampler fetch deadlines in seconds, overriding
+                SAMPLER_DEADLINES.
+        """
+        self.bandit = bandit_cls(base_arms=base_arms)
+        self.samplers = samplers if samplers is not None else LazySamplers()
+        self.deadlines = {**SAMPLER_DEADLINES, **(deadlines or {})}
+        self.seen = SeenSet()  # Keys of the items this user was already served
+        self._last_items: Dict[str, Item] = {}  # Most recent item served per arm name
+        self._served = OrderedDict()  # Item key -> arm name, for the last MAX_SERVED items
+        self._index: Dict[str, Arm] = {}
+        self._index_key = None
+        self.prefetch = PrefetchPool(self._fetch) if prefetch else None
+        self._watch_arms()
+
+    def _fetch(self, arm: Arm) -> Item:
+        """
+        Fetches a fresh item for the arm from its sampler.
+
+        Samplers make their network calls through call_upstream(), so an open circuit breaker
+        surfaces here as a SamplerError, while items drawn from cached feeds still come through.
+        """
+        sampler = self.samplers[arm.sampler_type]
+        try:
+            with metrics.timed("recsys_fetch", sampler=arm.sampler_type.name):
+                item = sampler.sample(arm.params, seen=self.seen)
+        except Exception:
+            metrics.inc("recsys_arm_fetches_total", sampler=arm.sampler_type.name, arm=arm.name, outcome="error")
+            raise
+        metrics.inc("recsys_arm_fetches_total", sampler=arm.sampler_type.name, arm=arm.name, outcome="ok")
+        return item
+
+    def _fetch_or_fallback(self, arm: Arm) -> Item:
+        """
+        Fetches an item for the arm, waiting no longer than its sampler's deadline.
+
+        If the fetch fails or is late, a fallback item is returned instead, see _fallback(). A
+        late fetch that already started keeps running in the background and its item goes to the
+        prefetch pool; one still queued behind other calls to the same upstream is cancelled.
+
+        Raises:
+            SamplerError: If the fetch failed or was late and there is no fallback item.
+        """
+        deadline = self.deadlines[arm.sampler_type]
+        future = fetch_executors[arm.sampler_type].submit(self._fetch, arm)
+        try:
+            return future.result(timeout=deadline)
+        except FutureTimeoutError:
+            _upstream_failed(arm.sampler_type)
+            if not future.cancel() and self.prefetch is not None:
+                future.add_done_callback(lambda future: self._keep_late(arm, future))
+            error = SamplerError(f"{arm.sampler_type.name} did not respond within {deadline:.1f}s")
+        except Exception as e:
+            error = e
+        fallback, source = self._fallback(arm)
+        metrics.inc("recsys_fallback_total", sampler=arm.sampler_type.name, result=source)
+        if fallback is not None:
+            return fallback
+        if isinstance(error, SamplerError):
+            raise error
+        raise SamplerError(f"Could not fetch an item for arm {arm.name}: {error}") from error
+
+    def _fallback(self, arm: Arm) -> tuple:
+        """
+        Returns (item, source) to serve for an arm whose fetch failed or is late.
+
+        Unseen items come first: one prefetched in the meantime, then one the sampler draws from
+        data it already holds, such as a cached feed. The arm's most recent item, which the user
+        has already seen, comes last. The item is None if there is no fallback at all.
+        """
+        item = self._pop_prefetched(arm)
+        if item is not None:
+            return item, "prefetch"
+        try:
+            item = self.samplers[arm.sampler_type].sample_cached(arm.params, seen=self.seen)
+        except Exception as e:
+            print(f"Could not draw a cached item for arm {arm.name}: {e}")
+            item = None
+        if item is not None and not self.is_seen(item):
+            return item, "cached"
+        item = self._last_items.get(arm.name)
+        return item, "missing" if item is None else "stale"
+
+    def mark_seen(self, item: Item):
+        """Records that the user received an item so samplers avoid drawing it again."""
+        key = getattr(item, 'key', None)
+        if key is not None:
+            self.seen.add(key)
+
+    def is_seen(self, item: Item) -> bool:
+        key = getattr(item, 'key', None)
+        return key is not None and key in self.seen
+
+    def _watch_arms(self):
+        """Keeps the prefetch pool in line with the current set of arms."""
+        if self.prefetch is not None:
+            # Arms below the selection threshold are never pulled, so don't spend fetches on them
+            self.prefetch.sync(
+                [arm for arm in self.bandit.get_valid_arms() if arm.score >= 4])
 
     def add_arm(self, arm: Arm):
-        self.bandit.arms.append(arm)
+        self.bandit.arms = self.bandit.arms + [arm]
+        self._watch_arms()
 
     def remove_arm(self, arm_name: str):
         self.bandit.arms = [
             arm for arm in self.bandit.arms if arm.name != arm_name]
+        self._watch_arms()
 
     def sample(self) -> Item:
         # Select an arm using the bandit algorithm
-        selected_arm = self.bandit.select_arm()
-        selected_arm.sample_arm()
+        with metrics.timed("recsys_select"):
+            selected_arm = self.bandit.select_arm()
+            self.bandit.pull_and_decay(selected_arm)
+
+        return self._next_item(selected_arm)
+
+    def sample_batch(self, k: int) -> List[Item]:
+        """Samples k items, selecting and decaying all k arms in one bandit call."""
+        with metrics.timed("recsys_select_batch"):
+            selected_arms = self.bandit.select_arms(k)
+            self.bandit.decay_batch(selected_arms)
+        return [self._next_item(arm) for arm in selected_arms]
+
+    async def asample_batch(self, k: int) -> List[Item]:
+        """
+        Samples k items like sample_batch, fetching them concurrently in worker threads.
+
+        Network calls per upstream API stay bounded by upstream_limits, see call_upstream().
+        """
+        with metrics.timed("recsys_select_batch"):
+            selected_arms = self.bandit.select_arms(k)
+            self.bandit.decay_batch(selected_arms)
+        return list(await asyncio.gather(
+            *(asyncio.to_thread(self._next_item, arm) for arm in selected_arms)))
+
+    def sample_digest(self, n: int, deadline: float = 5.0) -> List[Item]:
+        """
+        Samples one item from each of up to n distinct arms, fetching them concurrently.
+
+        Args:
+            n (int): Maximum number of items, one per arm.
+            deadline (float): Seconds to wait for the concurrent fetches.
+
+        Returns:
+            List[Item]: The items, in the order their arms were selected.
+        """
+        with metrics.timed("recsys_digest"):
+            with metrics.timed("recsys_select_batch"):
+                arms = self.bandit.select_distinct_arms(n)
+            return self.sample_arms(arms, deadline)
+
+    def sample_arms(self, arms: List[Arm], deadline: float = 5.0) -> List[Item]:
+        """
+        Pulls each of the given arms once and fetches one item per arm concurrently.
+
+        Arms with a prefetched item are served right away and the rest are fetched in parallel.
+        Fetches that fail or miss the deadline are replaced as in _fallback(), preferring an
+        unseen item to the arm's most recent one. Fetches still running at the deadline complete
+        in the background and go to the prefetch pool.
+
+        Args:
+            arms (List[Arm]): Arms to sample, each at most once.
+            deadline (float): Seconds to wait for the concurrent fetches.
+
+        Returns:
+            List[Item]: The items, in the order of `arms`.
+        """
+        self.bandit.decay_batch(arms)
+        items = {}
+        pending = {}
+        for arm in arms:
+            item = self._pop_prefetched(arm)
+            if item is not None:
+                items[arm.name] = item
+            else:
+                pending[fetch_executors[arm.sampler_type].submit(self._fetch, arm)] = arm
+        metrics.inc("recsys_digest_slots_total", source="prefetch", value=len(items))
+
+        done, late = wait(pending, timeout=deadline) if pending else (set(), set())
+        for future, arm in pending.items():
+            if future in done and future.exception() is None:
+                items[arm.name] = future.result()
+                metrics.inc("recsys_digest_slots_total", source="fetch")
+                continue
+            if future in late and deadline >= self.deadlines[arm.sampler_type]:
+                _upstream_failed(arm.sampler_type)
+            if future in late and not future.cancel() and self.prefetch is not None:
+                future.add_done_callback(lambda future, arm=arm: self._keep_late(arm, future))
+            fallback, source = self._fallback(arm)
+            metrics.inc("recsys_digest_slots_total", source=source)
+            if fallback is not None:
+                items[arm.name] = fallback
+
+        sampled = []
+        for arm in arms:
+            item = items.get(arm.name)
+            if item is not None:
+                self._deliver(arm, item)
+                sampled.append(item)
+        return sampled
+
+    def _keep_late(self, arm: Arm, future):
+        # A digest fetch that missed its deadline is still a fresh item for the next sample
+        if future.exception() is None:
+            self.prefetch.put(arm, future.result())
+
+    def _pop_prefetched(self, arm: Arm) -> Optional[Item]:
+        # Pooled items may have been delivered through another arm since they were fetched
+        if self.prefetch is None:
+            return None
+        sample = self.prefetch.pop(arm)
+        while sample is not None and self.is_seen(sample):
+            sample = self.prefetch.pop(arm)
+        metrics.inc("recsys_prefetch_total", sampler=arm.sampler_type.name,
+                    result="miss" if sample is None else "hit")
+        return sample
 
-        # Get the corresponding sampler
-        sampler_type = selected_arm.sampler_type
-        sampler = self.samplers[sampler_type]
+    def _deliver(self, arm: Arm, item: Item):
+        self.mark_seen(item)
+        self._last_items[arm.name] = item
+        key = getattr(item, 'key', None)
+        if key is not None:
+            self._served[key] = arm.name
+            if len(self._served) > MAX_SERVED:
+                self._served.popitem(last=False)
 
-        sample = sampler.sample(selected_arm.params)
+    def record_feedback(self, item_key: str, event: str) -> bool:
+        """
+        Passes a feedback event on a served item to the bandit, against the arm the item came from.
 
+        Args:
+            item_key (str): Key of the item, as in Item.key.
+            event (str): One of FEEDBACK_REWARDS, e.g. 'upvote'.
+
+        Returns:
+            bool: False if the item was not served recently or its arm was removed since.
+        """
+        if event not in FEEDBACK_REWARDS:
+            raise ValueError(f"Unknown feedback event: {event}")
+        arm = self.arm_index().get(self._served.get(item_key))
+        if arm is None:
+            return False
+        self.bandit.record_feedback(arm, FEEDBACK_REWARDS[event])
+        metrics.inc("recsys_feedback_total", event=event)
+        return True
+
+    def _next_item(self, arm: Arm) -> Item:
+        # Serve a prefetched item if one is ready, otherwise fetch it now within the deadline
+        sample = self._pop_prefetched(arm)
+        if sample is None:
+            sample = self._fetch_or_fallback(arm)
+        self._deliver(arm, sample)
         return sample
 
     def get_arms(self) -> dict:
@@ -292,30 +1205,112 @@ class Recommender:
             })
         return {'arms': arms_config}
 
-    def update_arms(self, new_arms_config: dict) -> bool:
+    def arm_index(self) -> Dict[str, Arm]:
         """
-        Update the current set of arms based on the provided configuration.
+        Returns name -> arm over all arms, base arms taking precedence.
+
+        Rebuilt only when the bandit's arm lists are replaced or resized.
+        """
+        arms, base_arms = self.bandit.arms, self.bandit.base_arms
+        key = self._index_key
+        if key is None or key[0] is not arms or key[1] is not base_arms or key[2] != (len(arms), len(base_arms)):
+            self._index = {arm.name: arm for arm in arms}
+            self._index.update((arm.name, arm) for arm in base_arms)
+            self._index_key = (arms, base_arms, (len(arms), len(base_arms)))
+        return self._index
+
+    def _apply(self, arm: Arm, name: str, params: dict, sampler_type: SamplerType, score: float,
+               changes: ArmChanges):
+        """Updates an existing arm in place, recording the fields that actually changed."""
+        fields = {}
+        if arm.params != params:
+            fields['params'] = (arm.params, params)
+            arm.params = params
+        if arm.sampler_type != sampler_type:
+            fields['sampler_type'] = (arm.sampler_type, sampler_type)
+            arm.sampler_type = sampler_type
+        if arm.score != score:
+            fields['score'] = (arm.score, score)
+            arm.score = score
+            self.bandit.arm_changed(arm)
+        if fields:
+            changes.changed[name] = fields
+            if self.prefetch is not None and ('params' in fields or 'sampler_type' in fields):
+                # Items fetched for the old config no longer match the arm
+                self.prefetch.forget(name)
+
+    def _record_changes(self, changes: ArmChanges):
+        for kind in ('added', 'removed', 'changed'):
+            count = len(getattr(changes, kind))
+            if count:
+                metrics.inc("recsys_arm_changes_total", value=count, kind=kind)
+
+    def update_arm(self, arm_config: dict) -> ArmChanges:
+        """
+        Adds or updates a single arm from its configuration, leaving all other arms untouched.
+
+        Args:
+            arm_config (dict): Configuration of one arm, as found in get_arms()['arms'].
+
+        Returns:
+            ArmChanges: What changed, empty if the arm already had this configuration.
+        """
+        name, params, sampler_type, score = parse_arm_config(arm_config)
+        changes = ArmChanges()
+        arm = self.arm_index().get(name)
+        if arm is None:
+            self.add_arm(Arm(name=name, params=params, sampler_type=sampler_type, init_score=score))
+            changes.added.append(name)
+        else:
+            self._apply(arm, name, params, sampler_type, score, changes)
+            if changes:
+                self._watch_arms()
+        self._record_changes(changes)
+        return changes
+
+    def update_arms(self, new_arms_config: dict) -> ArmChanges:
+        """
+        Brings the arms in line with the provided configuration, touching only what differs.
+
+        Arms in the config are added or updated in place, keeping their pulls. Non-base arms
+        missing from the config are removed; base arms are always kept. An arm listed more than
+        once takes its last entry. The config is fully validated before anything is changed.
 
         Args:
             new_arms_config (dict): Dictionary containing the new configuration of arms.
 
         Returns:
-            bool: True if the update was applied successfully, False otherwise.
-        """
-        new_arms = []
-        print(new_arms_config)
-        for arm_config in new_arms_config.get('arms', []):
-            if arm_config["name"] not in [arm.name for arm in self.bandit.base_arms]:
-                new_arm = Arm(
-                    name=arm_config['name'],
-                    params=arm_config['params'],
-                    sampler_type=SamplerType[arm_config['sampler_type']],
-                    init_score=arm_config['score']
-                )
-                new_arms.append(new_arm)
-            else:
-                base_arm = [arm for arm in self.bandit.base_arms if arm.name == arm_config['name']][0]
-                base_arm.params = arm_config['params']
-                base_arm.sampler_type = SamplerType[arm_config['sampler_type']]
-                base_arm.score = arm_config['score']
-        self.bandit.arms = new_arms
+            ArmChanges: Names of added and removed arms and the changed fields per arm.
+        """
+        with metrics.timed("recsys_update_arms"):
+            # Keyed by name in first-listed order, so a repeated name is applied once, with its last entry
+            entries = {}
+            for arm_config in new_arms_config.get('arms', []):
+                entry = parse_arm_config(arm_config)
+                entries[entry[0]] = entry
+            index = self.arm_index()
+            changes = ArmChanges()
+
+            new_arms = {}
+            for name, params, sampler_type, score in entries.values():
+                arm = index.get(name)
+                if arm is None:
+                    new_arms[name] = Arm(name=name, params=params, sampler_type=sampler_type, init_score=score)
+                    changes.added.append(name)
+                else:
+                    self._apply(arm, name, params, sampler_type, score, changes)
+
+            keep = entries.keys()
+            kept_arms = []
+            for arm in self.bandit.arms:
+                # Arms shadowed by a base arm of the same name are dropped as well
+                if arm.name in keep and index[arm.name] is arm:
+                    kept_arms.append(arm)
+                else:
+                    changes.removed.append(arm.name)
+            if changes.added or changes.removed:
+                self.bandit.arms = kept_arms + list(new_arms.values())
+            if changes:
+                self._watch_arms()
+            self._record_changes(changes)
+            return changes
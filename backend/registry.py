@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Set
+
+from backend.initial_state import new_recommender
+from backend.recsys import LazySamplers, Recommender
+from backend.snapshot import SnapshotStore
+
+
+class RecommenderRegistry:
+    def __init__(self, factory: Callable, max_recommenders: int = 1000, idle_timeout: float = 3600,
+                 store: SnapshotStore = None, prefetch: bool = True):
+        """
+        Process-wide registry of recommenders keyed by user or session, shared by all script runs.
+
+        Recommenders are evicted once idle for `idle_timeout` seconds, or least recently used
+        first when more than `max_recommenders` are held. All access is guarded by a lock since
+        Streamlit runs each session's script in its own thread.
+
+        Only recommenders of stable keys, such as logged-in users, are saved to the store. Those
+        fetched with persist=False, such as anonymous sessions whose id is never seen again, are
+        dropped on eviction, and the callbacks in `on_drop` are called with their key so that
+        other per-key state, such as scheduled deliveries, can be released too.
+
+        Args:
+            factory (Callable): Called with the shared samplers dict to build a new Recommender.
+            max_recommenders (int): Maximum number of recommenders kept.
+            idle_timeout (float): Seconds after the last access before a recommender is evicted.
+            store (SnapshotStore): If set, evicted recommenders are saved to it and recommenders
+                not held in memory are restored from it before falling back to the factory.
+            prefetch (bool): Whether restored recommenders prefetch items.
+        """
+        self.factory = factory
+        self.store = store
+        self.prefetch = prefetch
+        self.max_recommenders = max_recommenders
+        self.idle_timeout = idle_timeout
+        # Shared by all recommenders, each built on first use
+        self.samplers = LazySamplers()
+        self._recommenders: Dict[Hashable, tuple] = OrderedDict()  # key -> (last access, recommender)
+        self._transient: Set[Hashable] = set()
+        self.on_drop: List[Callable] = []
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, persist: bool = True) -> Recommender:
+        """
+        Returns the recommender for key, building it on first access.
+
+        Args:
+            key (Hashable): User or session key.
+            persist (bool): Whether the recommender is restored from and saved to the store.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._recommenders.get(key)
+            if entry is None and not persist:
+                self._transient.add(key)
+            rec = entry[1] if entry is not None else self._load(key)
+            self._put(key, rec, now)
+            return rec
+
+    def _load(self, key: Hashable) -> Recommender:
+        if self.store is not None and key not in self._transient and self.store.exists(key):
+            try:
+                return self.store.restore(key, samplers=self.samplers, prefetch=self.prefetch)
+            except Exception as e:
+                print(f"Could not restore recommender for {key}: {e}")
+        return self.factory(self.samplers)
+
+    def _put(self, key: Hashable, rec: Recommender, now: float):
+        self._recommenders[key] = (now, rec)
+        self._recommenders.move_to_end(key)
+        while len(self._recommenders) > self.max_recommenders:
+            self._drop(*self._recommenders.popitem(last=False))
+
+    def save(self, key: Hashable):
+        """Writes the recommender for key to the snapshot store, if it is held and a store is set."""
+        with self._lock:
+            entry = self._recommenders.get(key)
+            if entry is not None:
+                self._save(key, entry)
+
+    def _save(self, key: Hashable, entry: tuple):
+        if self.store is not None and key not in self._transient:
+            self.store.save(key, entry[1])
+
+    def reset(self, key: Hashable) -> Recommender:
+        """Replaces the recommender for key with a freshly built one, ignoring any snapshot."""
+        with self._lock:
+            rec = self.factory(self.samplers)
+            self._put(key, rec, time.monotonic())
+            self._save(key, (None, rec))
+            return rec
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._recommenders.pop(key, None)
+            self._transient.discard(key)
+
+    def _drop(self, key: Hashable, entry: tuple):
+        # An evicted recommender is saved, unless its key is never coming back
+        self._save(key, entry)
+        if key in self._transient:
+            self._transient.discard(key)
+            for callback in self.on_drop:
+                callback(key)
+
+    def _evict(self, now: float):
+        # Entries are ordered by last access, so idle ones are at the front
+        while self._recommenders:
+            key, (last_access, _) = next(iter(self._recommenders.items()))
+            if now - last_access <= self.idle_timeout:
+                break
+            self._drop(key, self._recommenders.pop(key))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._recommenders)
+
+
+# Shared by every Streamlit session in the process
+recommenders = RecommenderRegistry(lambda samplers: new_recommender(samplers=samplers),
+                                   store=SnapshotStore())
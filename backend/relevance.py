@@ -0,0 +1,127 @@
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Sequence
+
+import numpy as np
+
+from backend.cache import TTLCache
+from backend.fastpath import STOPWORDS, tokenize
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 1024):
+        """
+        Local, CPU-only text embedding: each word is hashed to one of `dim` signed buckets.
+
+        Texts sharing words get similar vectors, without a vocabulary to fit or a model to load.
+
+        Args:
+            dim (int): Vector size. Larger values mean fewer collisions between unrelated words.
+        """
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        """Returns the L2-normalised float32 vector of the text, all zeros if it has no words."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            if token in STOPWORDS:
+                continue
+            # crc32 rather than hash(), which is salted per process
+            bucket = zlib.crc32(token.encode())
+            vector[bucket % self.dim] += 1.0 if bucket & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class RelevanceRanker:
+    def __init__(self, embedder: HashingEmbedder = None, sharpness: float = 4.0, max_vectors: int = 50_000,
+                 max_groups: int = 512):
+        """
+        Weights candidate items by how well their text matches an arm's query.
+
+        Item and query vectors are computed once and kept in an LRU cache keyed by the item key.
+        The stacked matrix of a candidate group (e.g. one GNews feed or arXiv corpus) and its
+        weights per query are kept too, so they are only recomputed, with one matrix-vector
+        product, when the group's candidates change.
+        The weight of a candidate is exp(sharpness * cosine similarity), so unrelated items
+        are still drawn now and then.
+
+        Args:
+            embedder (HashingEmbedder): Text embedding to use, a default one if None.
+            sharpness (float): How strongly the draw favours the best matches; 0 draws uniformly.
+            max_vectors (int): Maximum number of item and query vectors cached.
+            max_groups (int): Maximum number of candidate group matrices cached.
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.sharpness = sharpness
+        self.max_groups = max_groups
+        self.vectors = TTLCache(max_entries=max_vectors, ttl=float("inf"))
+        self._groups = OrderedDict()  # group -> (signature, matrix, {query: cumulative weights})
+        self._lock = threading.Lock()
+
+    def embed(self, key: Hashable, text: Callable[[], str]) -> np.ndarray:
+        """Returns the cached vector for key, embedding text() on a miss."""
+        return self.vectors.get_or_load(key, lambda: self.embedder.embed(text()))
+
+    def _group(self, group: Hashable, candidates: Sequence, key: Callable, text: Callable) -> tuple:
+        """
+        Returns the group's cache entry, whose matrix of candidate vectors is rebuilt only when
+        the candidates change.
+
+        Args:
+            group (Hashable): Identifies the candidate list, e.g. ("gnews", query).
+            candidates (Sequence): Candidate items.
+            key (Callable): Returns a candidate's cache key.
+            text (Callable): Returns a candidate's text.
+        """
+        # Feeds are replaced and corpora are appended to and trimmed, all of which this catches
+        signature = (id(candidates), len(candidates), key(candidates[0]), key(candidates[-1]))
+        with self._lock:
+            cached = self._groups.get(group)
+            if cached is not None and cached[0] == signature:
+                self._groups.move_to_end(group)
+                return cached
+        matrix = np.stack([self.embed(key(candidate), lambda candidate=candidate: text(candidate))
+                           for candidate in candidates])
+        entry = (signature, matrix, {})
+        with self._lock:
+            self._groups[group] = entry
+            self._groups.move_to_end(group)
+            while len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+        return entry
+
+    def cum_weights(self, group: Hashable, candidates: Sequence, key: Callable, text: Callable,
+                    query: str) -> List[float]:
+        """
+        Returns cumulative draw weights of the candidates for the query, as random.choices expects.
+
+        Args:
+            group (Hashable): Identifies the candidate list, e.g. ("gnews", query).
+            candidates (Sequence): Candidate items, not empty.
+            key (Callable): Returns a candidate's cache key.
+            text (Callable): Returns a candidate's text.
+            query (str): The arm's query or topic.
+        """
+        _, matrix, weights = self._group(group, candidates, key, text)
+        cum_weights = weights.get(query)
+        if cum_weights is None:
+            similarity = matrix @ self.embed(("query", query), lambda: query)
+            cum_weights = np.cumsum(np.exp(self.sharpness * similarity, dtype=np.float64)).tolist()
+            weights[query] = cum_weights
+        return cum_weights
+
+
+_ranker = None
+_ranker_lock = threading.Lock()
+
+
+def shared_ranker() -> RelevanceRanker:
+    """Returns the ranker shared by all samplers in the process, created on first use."""
+    global _ranker
+    if _ranker is None:
+        with _ranker_lock:
+            if _ranker is None:
+                _ranker = RelevanceRanker()
+    return _ranker
@@ -0,0 +1,209 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as time_of_day, timedelta
+from typing import Callable, Dict, Hashable, List, Optional
+
+from backend.metrics import metrics
+from backend.recsys import Item
+from backend.registry import RecommenderRegistry, recommenders
+
+
+def next_occurrence(at: time_of_day, now: float) -> float:
+    """Returns the epoch time of the first `at` (local time of day) after `now`."""
+    current = datetime.fromtimestamp(now)
+    candidate = datetime.combine(current.date(), at)
+    if candidate.timestamp() <= now:
+        candidate += timedelta(days=1)
+    return candidate.timestamp()
+
+
+class Delivery:
+    def __init__(self, user: Hashable, at: time_of_day, topics: List[str], generation: int, when: float,
+                 persist: bool = True):
+        """
+        One user's delivery at one time of day, and the items prepared for it.
+
+        Args:
+            user (Hashable): User key, as used by the recommender registry.
+            at (time_of_day): Local time of day the delivery repeats at.
+            topics (List[str]): Names of the arms delivered together at that time.
+            generation (int): The user's schedule generation, deliveries of older ones are dropped.
+            when (float): Epoch time of this occurrence.
+            persist (bool): Whether the user's recommender is kept in the registry's store.
+        """
+        self.user = user
+        self.at = at
+        self.topics = topics
+        self.generation = generation
+        self.when = when
+        self.persist = persist
+        self.items: Optional[List[Item]] = None  # Set once prepared
+        self.due = False  # Set once the delivery time has passed
+
+
+class DeliveryScheduler:
+    def __init__(self, registry: RecommenderRegistry = recommenders, lead: float = 300, spread: float = 0.5,
+                 fetch_deadline: float = 60, workers: int = 8, outbox_size: int = 100,
+                 on_deliver: Callable = None):
+        """
+        Delivers each user's topics daily at their scheduled `time`, from items prepared ahead of time.
+
+        A single thread keeps a heap of timed events. Items are fetched and ranked by arm score
+        `lead` seconds before a delivery, in a worker pool. At the delivery time they are only
+        moved to the user's outbox, so one slot shared by thousands of users stays on time.
+        Preparations start at a random point within the first `spread` of the lead window so
+        that a shared slot does not hit the upstream APIs all at once.
+        Users whose recommender the registry drops, such as ended anonymous sessions, are
+        unscheduled.
+
+        Args:
+            registry (RecommenderRegistry): Where users' recommenders come from.
+            lead (float): Seconds before a delivery that its items are prepared.
+            spread (float): Share of the lead window over which preparations are spread.
+            fetch_deadline (float): Seconds a preparation waits for its fetches.
+            workers (int): Number of preparations run concurrently.
+            outbox_size (int): Undrained items kept per user; the oldest are dropped first.
+            on_deliver (Callable): Called with (user, items) for each delivery, from the scheduler thread.
+        """
+        self.registry = registry
+        self.lead = lead
+        self.spread = spread
+        self.fetch_deadline = fetch_deadline
+        self.outbox_size = outbox_size
+        self.on_deliver = on_deliver
+        self._heap = []  # (time, sequence, kind, delivery)
+        self._sequence = itertools.count()
+        self._generations: Dict[Hashable, int] = {}
+        self._outboxes: Dict[Hashable, deque] = {}
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="delivery")
+        self._thread: Optional[threading.Thread] = None
+        registry.on_drop.append(self.unschedule)
+
+    def schedule(self, user: Hashable, topics: List[dict], persist: bool = True):
+        """
+        Replaces the user's schedule with a daily delivery per distinct topic `time`.
+
+        Args:
+            user (Hashable): User key.
+            topics (List[dict]): Topics as in initial_state.topics; those without a time are skipped.
+            persist (bool): Whether the user's recommender is kept in the registry's store, as
+                for RecommenderRegistry.get.
+        """
+        by_time: Dict[time_of_day, List[str]] = {}
+        for topic in topics:
+            if topic.get("time") is not None:
+                by_time.setdefault(topic["time"], []).append(topic["topic"])
+        now = time.time()
+        with self._cond:
+            # Generations are unique across users, so one that is unscheduled can be forgotten
+            generation = next(self._sequence)
+            self._generations[user] = generation
+            for at, names in by_time.items():
+                self._push(Delivery(user, at, names, generation, next_occurrence(at, now), persist), now)
+            self._cond.notify()
+        self._start()
+
+    def unschedule(self, user: Hashable):
+        """Cancels the user's deliveries and drops their undrained items."""
+        with self._cond:
+            # Queued events of the old generation are skipped when they come up
+            self._generations.pop(user, None)
+            self._outboxes.pop(user, None)
+
+    def drain(self, user: Hashable) -> List[Item]:
+        """Returns and clears the items delivered to the user since the last call."""
+        with self._cond:
+            outbox = self._outboxes.get(user)
+            if not outbox:
+                return []
+            items = list(outbox)
+            outbox.clear()
+            return items
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def _push(self, delivery: Delivery, now: float):
+        prepare_at = delivery.when - self.lead + self.lead * self.spread * random.random()
+        heapq.heappush(self._heap, (max(now, prepare_at), next(self._sequence), "prepare", delivery))
+        heapq.heappush(self._heap, (delivery.when, next(self._sequence), "deliver", delivery))
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="delivery-scheduler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    self._cond.wait(self._heap[0][0] - time.time() if self._heap else None)
+                _, _, kind, delivery = heapq.heappop(self._heap)
+                if delivery.generation != self._generations.get(delivery.user):
+                    continue
+            if kind == "prepare":
+                self._executor.submit(self._prepare, delivery)
+            else:
+                self._deliver(delivery)
+
+    def _prepare(self, delivery: Delivery):
+        try:
+            with metrics.timed("scheduler_prepare"):
+                rec = self.registry.get(delivery.user, persist=delivery.persist)
+                # Ranked by the user's current interest in each topic; muted ones are left out, as
+                # the bandit never selects arms with score < 4
+                arms = sorted((arm for arm in rec.bandit.get_valid_arms()
+                               if arm.name in delivery.topics and arm.score >= 4),
+                              key=lambda arm: arm.score, reverse=True)
+                items = rec.sample_arms(arms, self.fetch_deadline)
+        except Exception as e:
+            print(f"Could not prepare delivery for {delivery.user}: {e}")
+            items = []
+        with self._cond:
+            delivery.items = items
+            late = delivery.due
+        if late:
+            self._send(delivery)
+
+    def _deliver(self, delivery: Delivery):
+        with self._cond:
+            delivery.due = True
+            ready = delivery.items is not None
+            # Queue tomorrow's occurrence
+            when = next_occurrence(delivery.at, delivery.when + 1)
+            self._push(Delivery(delivery.user, delivery.at, delivery.topics, delivery.generation, when,
+                                delivery.persist), time.time())
+            self._cond.notify()
+        if ready:
+            self._send(delivery)
+
+    def _send(self, delivery: Delivery):
+        lag = time.time() - delivery.when
+        metrics.observe("scheduler_delivery_lag_seconds", max(lag, 0.0))
+        metrics.inc("scheduler_deliveries_total", result="on_time" if lag < 1 else "late")
+        if not delivery.items:
+            return
+        with self._cond:
+            if delivery.generation != self._generations.get(delivery.user):
+                # Unscheduled while it was being prepared
+                return
+            outbox = self._outboxes.get(delivery.user)
+            if outbox is None:
+                outbox = self._outboxes[delivery.user] = deque(maxlen=self.outbox_size)
+            outbox.extend(delivery.items)
+        if self.on_deliver is not None:
+            self.on_deliver(delivery.user, delivery.items)
+
+
+# Shared by every Streamlit session in the process
+scheduler = DeliveryScheduler()
@@ -0,0 +1,100 @@
+import hashlib
+import math
+from typing import List
+
+
+class BloomFilter:
+    __slots__ = ("capacity", "num_bits", "num_hashes", "bits", "count")
+
+    def __init__(self, capacity: int, num_bits: int, num_hashes: int):
+        """
+        Fixed-size Bloom filter, one stage of a SeenSet.
+
+        Args:
+            capacity (int): Number of keys the filter is sized for.
+            num_bits (int): Size of the bit array.
+            num_hashes (int): Bits set per key.
+        """
+        self.capacity = capacity
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray((num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def sized(cls, capacity: int, error_rate: float) -> "BloomFilter":
+        """Returns a filter with a false positive rate of about `error_rate` once `capacity` keys were added."""
+        num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        return cls(capacity, num_bits, max(1, round(num_bits / capacity * math.log(2))))
+
+    def _positions(self, h1: int, h2: int):
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, h1: int, h2: int):
+        for position in self._positions(h1, h2):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def contains(self, h1: int, h2: int) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(h1, h2))
+
+
+def _hashes(key: str):
+    # Double hashing: derive all bit positions from one 128-bit digest
+    digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class SeenSet:
+    def __init__(self, initial_capacity: int = 1000, error_rate: float = 0.01, growth: int = 2,
+                 tightening: float = 0.5):
+        """
+        Scalable Bloom filter over item keys (URLs, arXiv entry ids, XKCD numbers).
+
+        Starts with a filter sized for `initial_capacity` keys, about 1.4 KB for the defaults, and
+        adds one `growth` times larger each time the newest is full, so memory follows the number
+        of keys the user actually saw. Each added filter has a `tightening` times lower error
+        rate, which keeps the overall false positive rate below `error_rate`. Membership tests
+        never give false negatives.
+
+        Args:
+            initial_capacity (int): Number of keys the first filter is sized for.
+            error_rate (float): Bound on the false positive rate, however many keys are added.
+            growth (int): Capacity ratio between consecutive filters.
+            tightening (float): Error rate ratio between consecutive filters, below 1.
+        """
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters: List[BloomFilter] = []
+        self.count = 0
+        self._grow()
+
+    def _grow(self):
+        n = len(self.filters)
+        # The error rates form a geometric series summing to error_rate
+        self.filters.append(BloomFilter.sized(self.initial_capacity * self.growth ** n,
+                                              self.error_rate * (1 - self.tightening) * self.tightening ** n))
+
+    def load(self, filters: List[BloomFilter]):
+        """Replaces the filters, e.g. with ones restored from a snapshot."""
+        self.filters = filters
+        self.count = sum(bloom.count for bloom in filters)
+
+    def add(self, key: str):
+        h1, h2 = _hashes(key)
+        if any(bloom.contains(h1, h2) for bloom in self.filters):
+            return
+        if self.filters[-1].count >= self.filters[-1].capacity:
+            self._grow()
+        self.filters[-1].add(h1, h2)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        h1, h2 = _hashes(key)
+        return any(bloom.contains(h1, h2) for bloom in self.filters)
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import weakref
+from array import array
+from typing import List, Optional
+
+from backend.policy import POLICIES
+from backend.seen import BloomFilter, SeenSet
+from backend.recsys import (Arm, ArxivItem, ChatItem, GNewsItem, Item, Recommender,
+                            SamplerType, XKCDItem)
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "data", "snapshots")
+
+MAGIC = b"RECS"
+VERSION = 1
+# magic, version, number of arms, bandit alpha, length of the JSON metadata block
+HEADER = struct.Struct("<4sHIdI")
+
+SEEN_MAGIC = b"SEEN"
+SEEN_VERSION = 1
+# magic, version, number of filters
+SEEN_HEADER = struct.Struct("<4sHI")
+# capacity, count, number of bits and of hashes of one filter, followed by its bit array
+SEEN_FILTER = struct.Struct("<QQQI")
+
+ITEM_TYPES = {cls.__name__: cls for cls in (ChatItem, GNewsItem, XKCDItem, ArxivItem)}
+
+
+def item_to_record(item: Item) -> dict:
+    return {'type': type(item).__name__, 'fields': item.fields()}
+
+
+def item_from_record(record: dict) -> Item:
+    # Items are rebuilt from their stored attributes, not re-parsed from API results
+    cls = ITEM_TYPES[record['type']]
+    item = cls.__new__(cls)
+    for name, value in record['fields'].items():
+        setattr(item, name, value)
+    return item
+
+
+def write_arms(rec: Recommender, path: str):
+    """
+    Writes the recommender's arms in a compact columnar layout.
+
+    Scores, pulls and decay rates are stored as packed float64/int64/float64 columns, followed by
+    sampler types and base-arm flags as bytes and a JSON block with names and params. The file is
+    replaced atomically.
+    """
+    base_ids = {id(arm) for arm in rec.bandit.base_arms}
+    arms = rec.bandit.get_valid_arms()
+    meta = json.dumps([[arm.name, arm.params] for arm in arms], default=str).encode()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(arms), rec.bandit.alpha, len(meta)))
+        array("d", [arm.score for arm in arms]).tofile(f)
+        array("q", [arm.pulls for arm in arms]).tofile(f)
+        array("d", [arm.decay_rate for arm in arms]).tofile(f)
+        f.write(bytes(arm.sampler_type.value for arm in arms))
+        f.write(bytes(id(arm) in base_ids for arm in arms))
+        f.write(meta)
+    os.replace(tmp_path, path)
+
+
+def read_arms(path: str):
+    """Reads a file written by write_arms and returns (arms, base_arms, alpha)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, count, alpha, meta_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} arms snapshot: {path}")
+    offset = HEADER.size
+    columns = []
+    for typecode in "dqd":
+        column = array(typecode)
+        column.frombytes(data[offset:offset + count * column.itemsize])
+        offset += count * column.itemsize
+        columns.append(column)
+    scores, pulls, decay_rates = columns
+    sampler_types = data[offset:offset + count]
+    is_base = data[offset + count:offset + 2 * count]
+    meta = json.loads(data[offset + 2 * count:offset + 2 * count + meta_length])
+
+    arms, base_arms = [], []
+    for i, (name, params) in enumerate(meta):
+        arm = Arm(name, params, sampler_type=SamplerType(sampler_types[i]),
+                  init_score=scores[i], decay_rate=decay_rates[i])
+        arm.pulls = pulls[i]
+        (base_arms if is_base[i] else arms).append(arm)
+    return arms, base_arms, alpha
+
+
+def write_seen(seen: SeenSet, path: str):
+    """Writes the filters of a seen-item set, replacing the file atomically."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SEEN_HEADER.pack(SEEN_MAGIC, SEEN_VERSION, len(seen.filters)))
+        for bloom in seen.filters:
+            f.write(SEEN_FILTER.pack(bloom.capacity, bloom.count, bloom.num_bits, bloom.num_hashes))
+            f.write(bloom.bits)
+    os.replace(tmp_path, path)
+
+
+def read_seen(path: str) -> List[BloomFilter]:
+    """Reads the filters written by write_seen."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, num_filters = SEEN_HEADER.unpack_from(data)
+    if magic != SEEN_MAGIC or version != SEEN_VERSION:
+        raise ValueError(f"Not a version {SEEN_VERSION} seen-item snapshot: {path}")
+    offset = SEEN_HEADER.size
+    filters = []
+    for _ in range(num_filters):
+        capacity, count, num_bits, num_hashes = SEEN_FILTER.unpack_from(data, offset)
+        offset += SEEN_FILTER.size
+        bloom = BloomFilter(capacity, num_bits, num_hashes)
+        bloom.count = count
+        bloom.bits[:] = data[offset:offset + len(bloom.bits)]
+        offset += len(bloom.bits)
+        filters.append(bloom)
+    return filters
+
+
+class ItemLog:
+    def __init__(self, path: str):
+        """
+        Append-only log of thread items.
+
+        Items are stored one JSON record per line, with a side file of byte offsets so that any
+        item can be read without parsing the others. Nothing is read until an item is accessed.
+
+        Args:
+            path (str): Path of the log file; the offsets live next to it with an `.idx` suffix.
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self._offsets: Optional[array] = None
+        self._lock = threading.Lock()
+
+    def _load_offsets(self) -> array:
+        if self._offsets is None:
+            offsets = array("Q")
+            if os.path.exists(self.index_path):
+                with open(self.index_path, "rb") as f:
+                    offsets.frombytes(f.read())
+            self._offsets = offsets
+        return self._offsets
+
+    def append(self, item: Item):
+        record = json.dumps(item_to_record(item), default=str).encode() + b"\n"
+        with self._lock:
+            offsets = self._load_offsets()
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(record)
+            with open(self.index_path, "ab") as f:
+                array("Q", [offset]).tofile(f)
+            offsets.append(offset)
+
+    def clear(self):
+        with self._lock:
+            for path in (self.path, self.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._offsets = array("Q")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load_offsets())
+
+    def read(self, start: int, stop: int) -> List[Item]:
+        """Returns the items in positions [start, stop), reading only their bytes."""
+        with self._lock:
+            offsets = self._load_offsets()
+            start, stop, _ = slice(start, stop).indices(len(offsets))
+            if start >= stop:
+                return []
+            end = offsets[stop] if stop < len(offsets) else None
+            with open(self.path, "rb") as f:
+                f.seek(offsets[start])
+                data = f.read(end - offsets[start]) if end is not None else f.read()
+        return [item_from_record(json.loads(line)) for line in data.splitlines()]
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return self.read(position.start or 0, len(self) if position.stop is None else position.stop)
+        position = position + len(self) if position < 0 else position
+        items = self.read(position, position + 1)
+        if not items:
+            raise IndexError("ItemLog index out of range")
+        return items[0]
+
+
+def temporary_item_log() -> ItemLog:
+    """
+    Returns an item log in a new temporary directory, for threads that are not kept across
+    sessions. The directory is removed once the log is garbage collected, or at exit.
+    """
+    directory = tempfile.mkdtemp(prefix="items-")
+    log = ItemLog(os.path.join(directory, "items.log"))
+    weakref.finalize(log, shutil.rmtree, directory, True)
+    return log
+
+
+class SnapshotStore:
+    def __init__(self, directory: str = DEFAULT_DIR):
+        """
+        Per-user snapshots of recommender state: columnar arms, the seen-item filter, the item log
+        and, for the feedback-driven bandits of backend.policy, the bandit class and its posteriors.
+
+        Args:
+            directory (str): Root directory, holding one subdirectory per user, named after a hash
+                of the user key.
+        """
+        self.directory = directory
+
+    def _user_dir(self, user: str) -> str:
+        # User keys come from sessions, logins and query strings. Naming the directory after a
+        # hash of the key keeps every key inside the root and gives distinct keys distinct
+        # directories, whatever characters they contain
+        return os.path.join(self.directory, hashlib.sha256(str(user).encode()).hexdigest()[:32])
+
+    def exists(self, user: str) -> bool:
+        return os.path.exists(os.path.join(self._user_dir(user), "arms.bin"))
+
+    def save(self, user: str, rec: Recommender):
+        """Writes the user's arms and seen-item filter. Items are written as they are appended."""
+        user_dir = self._user_dir(user)
+        os.makedirs(user_dir, exist_ok=True)
+        write_arms(rec, os.path.join(user_dir, "arms.bin"))
+        write_seen(rec.seen, os.path.join(user_dir, "seen.bin"))
+        policy_path = os.path.join(user_dir, "policy.json")
+        if type(rec.bandit).__name__ in POLICIES:
+            with open(policy_path + ".tmp", "w") as f:
+                json.dump({'bandit': type(rec.bandit).__name__, 'posteriors': rec.bandit.state()}, f)
+            os.replace(policy_path + ".tmp", policy_path)
+        elif os.path.exists(policy_path):
+            os.remove(policy_path)
+
+    def restore(self, user: str, **kwargs) -> Recommender:
+        """
+        Rebuilds the user's recommender from its snapshot.
+
+        Args:
+            user (str): User key the snapshot was saved under.
+            **kwargs: Passed on to Recommender, e.g. prefetch or samplers. The saved bandit class
+                is used unless bandit_cls is given.
+        """
+        user_dir = self._user_dir(user)
+        arms, base_arms, alpha = read_arms(os.path.join(user_dir, "arms.bin"))
+        policy = None
+        policy_path = os.path.join(user_dir, "policy.json")
+        if os.path.exists(policy_path):
+            with open(policy_path) as f:
+                policy = json.load(f)
+            kwargs.setdefault('bandit_cls', POLICIES[policy['bandit']])
+        rec = Recommender(base_arms, **kwargs)
+        rec.bandit.alpha = alpha
+        rec.bandit.arms = arms
+        seen_path = os.path.join(user_dir, "seen.bin")
+        if os.path.exists(seen_path):
+            rec.seen.load(read_seen(seen_path))
+        if policy is not None and hasattr(rec.bandit, 'load_state'):
+            rec.bandit.load_state(policy['posteriors'])
+        rec._watch_arms()
+        return rec
+
+    def item_log(self, user: str) -> ItemLog:
+        user_dir = self._user_dir(user)
+        os.makedirs(user_dir, exist_ok=True)
+        return ItemLog(os.path.join(user_dir, "items.log"))
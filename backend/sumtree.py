@@ -0,0 +1,57 @@
+from typing import List
+
+
+class FenwickTree:
+    def __init__(self, weights: List[float] = []):
+        """
+        Fenwick (binary indexed) tree over non-negative weights.
+
+        Supports O(log n) point updates and O(log n) weighted draws via find().
+
+        Args:
+            weights (List[float]): Initial weights, built in O(n).
+        """
+        self.size = len(weights)
+        self.weights = list(weights)
+        self.tree = [0.0] + list(weights)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+        self._top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def total(self) -> float:
+        return self.prefix_sum(self.size)
+
+    def prefix_sum(self, count: int) -> float:
+        """Sum of the first `count` weights."""
+        total = 0.0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+
+    def set(self, index: int, weight: float):
+        """Sets the weight at a 0-based index."""
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def find(self, target: float) -> int:
+        """
+        Returns the 0-based index whose cumulative weight range contains target,
+        i.e. the smallest i with prefix_sum(i + 1) > target.
+        """
+        position = 0
+        bit = self._top_bit
+        while bit:
+            nxt = position + bit
+            if nxt <= self.size and self.tree[nxt] <= target:
+                position = nxt
+                target -= self.tree[nxt]
+            bit >>= 1
+        # Rounding can only push a draw of total() * (1 - eps) past the end
+        return min(position, self.size - 1)
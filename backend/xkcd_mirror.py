@@ -0,0 +1,131 @@
+import json
+import logging
+import mmap
+import os
+import random
+import threading
+from array import array
+from typing import Optional
+from urllib.error import HTTPError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "data", "xkcd")
+
+# Fields kept per comic, matching what XKCDItem reads
+FIELDS = ("number", "title", "altText", "imageLink", "imageName", "link")
+
+
+class XKCDMirror:
+    def __init__(self, directory: str = DEFAULT_DIR):
+        """
+        Local, append-only store of XKCD comic metadata.
+
+        Records are stored one JSON object per line in `comics.jsonl`, memory-mapped on first use.
+        `comics.idx` holds a flat array of (comic number, byte offset) pairs, so a random draw
+        is a single index lookup followed by parsing one line.
+
+        Args:
+            directory (str): Directory holding the mirror files, created on first sync.
+        """
+        self.directory = directory
+        self.data_path = os.path.join(directory, "comics.jsonl")
+        self.index_path = os.path.join(directory, "comics.idx")
+        self._index: Optional[array] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> array:
+        if self._index is None:
+            index = array("Q")
+            if os.path.exists(self.index_path):
+                with open(self.index_path, "rb") as f:
+                    index.frombytes(f.read())
+            self._index = index
+        return self._index
+
+    def _data(self) -> mmap.mmap:
+        if self._mmap is None:
+            with open(self.data_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load_index()) // 2
+
+    def max_number(self) -> int:
+        """Returns the highest comic number stored, or 0 for an empty mirror."""
+        with self._lock:
+            return max(self._load_index()[0::2], default=0)
+
+    def get(self, position: int) -> dict:
+        """Returns the metadata of the comic stored at the given position."""
+        with self._lock:
+            index = self._load_index()
+            start = index[2 * position + 1]
+            end = index[2 * position + 3] if 2 * position + 3 < len(index) else None
+            data = self._data()
+            return json.loads(data[start:end] if end is not None else data[start:])
+
+    def random(self) -> Optional[dict]:
+        """Returns the metadata of a random stored comic, or None if the mirror is empty."""
+        count = len(self)
+        if count == 0:
+            return None
+        return self.get(random.randrange(count))
+
+    def add(self, comic: dict):
+        """Appends one comic's metadata to the mirror."""
+        record = json.dumps({field: comic.get(field) for field in FIELDS}).encode() + b"\n"
+        with self._lock:
+            index = self._load_index()
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.data_path, "ab") as f:
+                offset = f.tell()
+                f.write(record)
+            entry = array("Q", [comic["number"], offset])
+            with open(self.index_path, "ab") as f:
+                entry.tofile(f)
+            index.extend(entry)
+            # The mapping has a fixed size, so remap on the next read
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def sync(self, max_fetch: Optional[int] = None) -> int:
+        """
+        Fetches the comics newer than the highest stored number.
+
+        Comics are stored as they are fetched, so when a fetch fails the error is raised and the
+        next call resumes at the failed number. Only numbers without a comic are skipped.
+
+        Args:
+            max_fetch (int): Maximum number of comics fetched in this call, None for no limit.
+
+        Returns:
+            int: The number of comics added.
+        """
+        import xkcd
+        latest = xkcd.getLatestComicNum()
+        added = 0
+        for number in range(self.max_number() + 1, latest + 1):
+            if max_fetch is not None and added >= max_fetch:
+                break
+            # Comic() fetches a single comic; getComic() would re-request the latest number each time
+            try:
+                comic = xkcd.Comic(number)
+            except HTTPError as e:
+                if e.code != 404:
+                    raise
+                # Some numbers (like #404) have no comic
+                logger.info("Skipping XKCD comic #%d: %s", number, e)
+                continue
+            self.add(vars(comic))
+            added += 1
+        return added
+
+
+if __name__ == "__main__":
+    mirror = XKCDMirror()
+    print(f"Added {mirror.sync()} comics, {len(mirror)} stored in {mirror.directory}")
@@ -0,0 +1,43 @@
+"""
+Compares the arm selection strategies in backend.recsys.
+
+Each step selects an arm and pulls it (select_arm + pull_and_decay), which is what
+Recommender.sample() does before fetching. Run from the repository root:
+
+    python -m benchmarks.bench_bandit
+"""
+import time
+
+from backend.recsys import ArrayBandit, Bandit, SumTreeBandit
+from benchmarks.fakes import make_arms
+
+ARM_COUNTS = [10, 100, 1_000, 10_000, 100_000]
+STRATEGIES = [Bandit, ArrayBandit, SumTreeBandit]
+
+
+def time_steps(bandit_cls: type, n: int) -> float:
+    """Returns the mean seconds per select + pull step."""
+    bandit = bandit_cls(base_arms=make_arms(n))
+    bandit.pull_and_decay(bandit.select_arm())  # Build any index outside the timed loop
+    steps = max(20, min(2_000, 2_000_000 // n))
+    start = time.perf_counter()
+    for _ in range(steps):
+        bandit.pull_and_decay(bandit.select_arm())
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    results = {n: {cls.__name__: time_steps(cls, n) for cls in STRATEGIES} for n in ARM_COUNTS}
+
+    names = [cls.__name__ for cls in STRATEGIES]
+    print(f"{'arms':>8} " + " ".join(f"{name + ' (us)':>20}" for name in names))
+    for n, timings in results.items():
+        print(f"{n:>8} " + " ".join(f"{timings[name] * 1e6:>20.1f}" for name in names))
+
+    for name in names[1:]:
+        crossover = next((n for n, timings in results.items() if timings[name] < timings['Bandit']), None)
+        print(f"{name} beats Bandit from {crossover} arms" if crossover else f"{name} never beats Bandit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Reports resident bytes per thread item, measured with tracemalloc over 100k-item threads.
+
+Items are built the way the samplers build them, from API-shaped dicts with fresh
+(non-shared) strings, so the numbers include interning of repeated fields. Run from the
+repository root:
+
+    python -m benchmarks.bench_item_memory
+"""
+import datetime
+import tracemalloc
+from types import SimpleNamespace
+
+from backend import initial_state
+from backend.recsys import ArxivItem, ChatItem, GNewsItem, XKCDItem
+
+THREAD_LENGTH = 100_000
+PUBLISHERS = ["The New York Times", "BBC", "Reuters", "The Guardian", "ESPNcricinfo"]
+
+
+def fresh(text: str) -> str:
+    # Decoded API payloads never share string objects, so build a new one each time
+    return "".join(list(text))
+
+
+def gnews_item(i: int) -> GNewsItem:
+    return GNewsItem({
+        'title': f"Article number {i}",
+        'description': f"Description of article number {i}",
+        'published date': fresh("Sat, 05 Oct 2024 07:00:00 GMT"),
+        'publisher': {'title': fresh(PUBLISHERS[i % len(PUBLISHERS)])},
+        'url': f"https://news.example.com/{i}",
+    })
+
+
+def xkcd_item(i: int) -> XKCDItem:
+    return XKCDItem({'number': i, 'title': f"Comic {i}", 'altText': f"Alt text {i}",
+                     'imageLink': f"https://imgs.xkcd.com/comics/{i}.png",
+                     'imageName': f"{i}.png", 'link': f"https://xkcd.com/{i}"})
+
+
+def arxiv_item(i: int) -> ArxivItem:
+    return ArxivItem(SimpleNamespace(
+        title=f"Paper {i}", authors=[SimpleNamespace(name=f"Author {i}")],
+        summary=f"Summary of paper {i}", published=datetime.datetime(2024, 10, 1 + i % 28),
+        pdf_url=f"https://arxiv.org/pdf/{i}", entry_id=f"https://arxiv.org/abs/{i}"))
+
+
+def chat_item(i: int) -> ChatItem:
+    return ChatItem({'sender': fresh("User" if i % 2 else "Assistant"), 'message': f"Message {i}"})
+
+
+def mixed_item(i: int):
+    return (gnews_item, xkcd_item, arxiv_item, chat_item)[i % 4](i)
+
+
+def bytes_per_item(make) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    thread = [make(i) for i in range(THREAD_LENGTH)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del thread
+    return (after - before) / THREAD_LENGTH
+
+
+def initial_thread_bytes(sessions: int = 1_000) -> float:
+    """Bytes per session for the starting thread, which sessions share instead of deep-copying."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    threads = [list(initial_state.thread) for _ in range(sessions)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del threads
+    return (after - before) / sessions
+
+
+def main():
+    for name, make in [("GNewsItem", gnews_item), ("XKCDItem", xkcd_item), ("ArxivItem", arxiv_item),
+                       ("ChatItem", chat_item), ("mixed thread", mixed_item)]:
+        print(f"{name:>14}: {bytes_per_item(make):8.1f} bytes/item over {THREAD_LENGTH} items")
+    print(f"{'initial thread':>14}: {initial_thread_bytes():8.1f} bytes/session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures the LLM scoring path in backend.llm against a fake chat model.
+
+Reports the per-call overhead of rebuilding the prompt | llm | parser chain versus
+reusing an ArmScorer, and how long the event loop is blocked while a call is in
+flight through invoke() versus ainvoke(). Run from the repository root:
+
+    python -m benchmarks.bench_llm_chain
+"""
+import asyncio
+import json
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from backend.llm import ArmScorer
+
+ARMS_CONFIG = {'arms': [
+    {'name': topic, 'params': {'query': topic}, 'sampler_type': 'GNEWS', 'score': 4.0}
+    for topic in ["Weather", "Ukraine", "Cricket"]
+] + [{'name': 'XKCD', 'params': {}, 'sampler_type': 'XKCD', 'score': 1.0}]}
+RESPONSE = json.dumps(ARMS_CONFIG)
+QUERY = "more cricket please"
+
+
+def per_call_overhead(calls: int = 200):
+    llm = FakeListChatModel(responses=[RESPONSE])
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        ArmScorer(llm).invoke(ARMS_CONFIG, QUERY)
+    rebuilt = (time.perf_counter() - start) / calls
+
+    scorer = ArmScorer(llm)
+    start = time.perf_counter()
+    for _ in range(calls):
+        scorer.invoke(ARMS_CONFIG, QUERY)
+    reused = (time.perf_counter() - start) / calls
+    return rebuilt, reused
+
+
+async def max_loop_stall(use_async: bool, latency: float = 0.2) -> float:
+    """Runs one scoring call next to a 1 ms heartbeat and returns the longest gap between beats."""
+    scorer = ArmScorer(FakeListChatModel(responses=[RESPONSE], sleep=latency))
+    gaps = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    async def score():
+        await asyncio.sleep(0.01)
+        if use_async:
+            await scorer.ainvoke(ARMS_CONFIG, QUERY)
+        else:
+            scorer.invoke(ARMS_CONFIG, QUERY)
+        done.set()
+
+    await asyncio.gather(heartbeat(), score())
+    return max(gaps)
+
+
+def main():
+    rebuilt, reused = per_call_overhead()
+    print(f"chain rebuilt per call: {rebuilt * 1e3:.3f} ms/call")
+    print(f"chain reused:           {reused * 1e3:.3f} ms/call")
+    print(f"event loop stall, invoke():  {asyncio.run(max_loop_stall(False)) * 1e3:.1f} ms")
+    print(f"event loop stall, ainvoke(): {asyncio.run(max_loop_stall(True)) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
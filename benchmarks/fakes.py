@@ -0,0 +1,89 @@
+"""
+Deterministic stand-ins for the network-backed parts of the recommender, for offline benchmarks.
+"""
+import contextlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from backend import recsys
+from backend.recsys import Arm, GNewsItem, Recommender, Sampler, SamplerType, call_upstream
+
+
+def make_arms(n: int, seed: int = 0, spread: bool = False) -> List[Arm]:
+    """Returns n GNews arms with random scores, or arms taking turns over every upstream if `spread`."""
+    rng = random.Random(seed)
+    sampler_types = list(SamplerType) if spread else [SamplerType.GNEWS]
+    return [Arm(f"arm-{i}", {'query': f"topic {i}"}, sampler_type=sampler_types[i % len(sampler_types)],
+                init_score=rng.uniform(1, 10)) for i in range(n)]
+
+
+def arms_config(n: int, seed: int = 0) -> dict:
+    """Returns a get_arms()-style config for n arms."""
+    return {'arms': [{'name': arm.name, 'params': arm.params, 'sampler_type': arm.sampler_type.name,
+                      'score': arm.score} for arm in make_arms(n, seed)]}
+
+
+def make_recommender(n: int, latency: float = 0.0, spread: bool = False, **kwargs) -> Recommender:
+    """Recommender with n user arms, as from make_arms, on top of no base arms, drawing from fake samplers."""
+    rec = Recommender([], samplers=fake_samplers(latency), **kwargs)
+    rec.bandit.arms = make_arms(n, spread=spread)
+    return rec
+
+
+@contextlib.contextmanager
+def upstream_capacity(limit: int):
+    """Lets `limit` calls run at once against every upstream for the duration of the block."""
+    saved = dict(recsys.upstream_limits), dict(recsys.fetch_executors)
+    executors = {sampler_type: ThreadPoolExecutor(max_workers=limit) for sampler_type in SamplerType}
+    recsys.upstream_limits.update({sampler_type: threading.BoundedSemaphore(limit) for sampler_type in SamplerType})
+    recsys.fetch_executors.update(executors)
+    try:
+        yield
+    finally:
+        recsys.upstream_limits.update(saved[0])
+        recsys.fetch_executors.update(saved[1])
+        for executor in executors.values():
+            executor.shutdown(wait=False)
+
+
+class FakeSampler(Sampler):
+    def __init__(self, sampler_type: SamplerType = SamplerType.GNEWS, latency: float = 0.0):
+        """
+        Returns numbered articles for the arm's params instead of calling an API.
+
+        Args:
+            sampler_type (SamplerType): Upstream whose concurrency limit and breaker the fake call goes through.
+            latency (float): Seconds each call sleeps, standing in for the network round trip.
+        """
+        self.sampler_type = sampler_type
+        self.latency = latency
+        self.calls = 0
+
+    def sample(self, params: Dict[str, str] = {}, seen=None):
+        if self.latency:
+            call_upstream(self.sampler_type, lambda: time.sleep(self.latency))
+        self.calls += 1
+        query = params.get('query') or params.get('topic') or self.sampler_type.name
+        return GNewsItem({
+            'title': f"{query} #{self.calls}",
+            'description': f"Article {self.calls} about {query}",
+            'published date': "Sat, 05 Oct 2024 07:00:00 GMT",
+            'publisher': {'title': "Benchmark News"},
+            'url': f"https://bench.example.com/{self.sampler_type.name}/{self.calls}",
+        })
+
+
+def fake_samplers(latency: float = 0.0) -> Dict[SamplerType, Sampler]:
+    return {sampler_type: FakeSampler(sampler_type, latency) for sampler_type in SamplerType}
+
+
+def fake_llm(config: dict, latency: float = 0.0):
+    """Chat model that answers every prompt with config, every score raised by one, as ArmsConfig JSON."""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    response = {'arms': [dict(arm, score=min(10.0, arm['score'] + 1)) for arm in config['arms']]}
+    return FakeListChatModel(responses=[json.dumps(response)], sleep=latency or None)
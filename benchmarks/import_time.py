@@ -0,0 +1,57 @@
+"""
+Reports the cold import cost of the backend modules and of building a first recommender.
+
+Each measurement runs in a fresh interpreter with `-X importtime`, so nothing is already
+imported. The slowest imported packages are listed per target, which shows whether heavy
+client libraries (langchain, gnews, arxiv, numpy) are still pulled in eagerly. Run from the
+repository root:
+
+    python -m benchmarks.import_time
+"""
+import subprocess
+import sys
+import time
+
+TARGETS = [
+    ("import backend.recsys", "import backend.recsys"),
+    ("import backend.llm", "import backend.llm"),
+    ("import backend.registry", "import backend.registry"),
+    ("first recommender", "from backend.initial_state import new_recommender; new_recommender(prefetch=False)"),
+]
+TOP = 8
+
+
+def importtime(code: str):
+    """Runs code in a fresh interpreter and returns (wall seconds, {top-level package: cumulative us})."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Top-level entries (no indentation) carry the cost of everything they imported
+        if name == name.lstrip():
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + int(cumulative)
+    return seconds, packages
+
+
+def main():
+    for label, code in TARGETS:
+        try:
+            seconds, packages = importtime(code)
+        except RuntimeError as e:
+            print(f"{label:<26} failed: {e}")
+            continue
+        print(f"{label:<26} {seconds * 1e3:8.1f} ms wall")
+        for package, us in sorted(packages.items(), key=lambda entry: -entry[1])[:TOP]:
+            print(f"    {package:<24} {us / 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
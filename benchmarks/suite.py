@@ -0,0 +1,178 @@
+"""
+Offline benchmark suite for the recommender hot paths, with a saved baseline to catch regressions.
+
+Every case runs against the stand-ins in benchmarks.fakes, so no API or LLM is called:
+
+    select_arm        Bandit.select_arm + pull_and_decay, per arm count
+    sample            Recommender.sample without prefetch, per arm count
+    update_arms       Recommender.update_arms with a full config, per arm count
+    update_arm_scores llm.update_arm_scores with a fake chat model, per arm count
+    thread_window     ThreadHistory.window over an on-disk item log, per thread length
+    asample_batch     Recommender.asample_batch with 5 ms fake fetches spread over the upstreams,
+                      per batch size (concurrency)
+
+Results are seconds per operation (best of several repeats). Run from the repository root:
+
+    python -m benchmarks.suite                  # run and compare with benchmarks/baseline.json
+    python -m benchmarks.suite --save           # run and write the baseline
+    python -m benchmarks.suite --quick -k sample
+
+The exit status is 1 if any case is slower than its baseline by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from backend import llm
+from backend.history import ThreadHistory
+from backend.recsys import Bandit, ChatItem
+from backend.snapshot import ItemLog
+from benchmarks.fakes import arms_config, fake_llm, make_arms, make_recommender, upstream_capacity
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+ARM_COUNTS = [10, 1_000, 100_000]
+THREAD_LENGTHS = [100, 10_000]
+CONCURRENCY = [1, 8, 32]
+
+
+def measure(fn: Callable, number: int, repeat: int = 3) -> float:
+    """Returns the best mean seconds per call of fn over `repeat` runs of `number` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def calls_for(n: int, budget: int = 200_000) -> int:
+    # Keep each case to roughly the same amount of work
+    return max(3, min(1_000, budget // n))
+
+
+def bench_select_arm(n: int) -> float:
+    bandit = Bandit(base_arms=make_arms(n))
+    return measure(lambda: bandit.pull_and_decay(bandit.select_arm()), calls_for(n))
+
+
+def bench_sample(n: int) -> float:
+    rec = make_recommender(n)
+    return measure(rec.sample, calls_for(n))
+
+
+def bench_update_arms(n: int) -> float:
+    rec = make_recommender(n)
+    config = arms_config(n, seed=1)
+    return measure(lambda: rec.update_arms(config), calls_for(n, 20_000))
+
+
+def bench_update_arm_scores(n: int) -> float:
+    config = arms_config(n)
+    model = fake_llm(config)
+    llm.update_arm_scores(model, config, "more topic 1 please")  # Build the shared scorer outside the timing
+    return measure(lambda: llm.update_arm_scores(model, config, "more topic 1 please"),
+                   calls_for(n, 20_000))
+
+
+def bench_thread_window(length: int, size: int = 500) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        log = ItemLog(os.path.join(directory, "items.log"))
+        thread = ThreadHistory(log)
+        thread.extend(ChatItem({'sender': "User", 'message': f"Message {i}"}) for i in range(length))
+        return measure(lambda: thread.window(size), 50)
+
+
+def bench_asample_batch(k: int, latency: float = 0.005) -> float:
+    # The upstreams and the loop's worker threads get room for the whole batch, so neither the
+    # upstream limits nor the machine's core count cap the concurrency measured
+    rec = make_recommender(100, latency, spread=True)
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=k))
+    try:
+        with upstream_capacity(k):
+            return measure(lambda: loop.run_until_complete(rec.asample_batch(k)), 5) / k
+    finally:
+        loop.close()
+
+
+def cases(quick: bool = False) -> Dict[str, Callable[[], float]]:
+    arm_counts = ARM_COUNTS[:2] if quick else ARM_COUNTS
+    thread_lengths = THREAD_LENGTHS[:1] if quick else THREAD_LENGTHS
+    all_cases = {}
+    for n in arm_counts:
+        all_cases[f"select_arm[arms={n}]"] = lambda n=n: bench_select_arm(n)
+        all_cases[f"sample[arms={n}]"] = lambda n=n: bench_sample(n)
+        all_cases[f"update_arms[arms={n}]"] = lambda n=n: bench_update_arms(n)
+    # Prompts and responses grow with every arm, 100k arms would mostly measure JSON
+    for n in ARM_COUNTS[:2]:
+        all_cases[f"update_arm_scores[arms={n}]"] = lambda n=n: bench_update_arm_scores(n)
+    for length in thread_lengths:
+        all_cases[f"thread_window[items={length}]"] = lambda length=length: bench_thread_window(length)
+    for k in CONCURRENCY:
+        all_cases[f"asample_batch[concurrency={k}]"] = lambda k=k: bench_asample_batch(k)
+    return all_cases
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Prints each result next to its baseline and returns the names of the regressed cases."""
+    regressions = []
+    print(f"{'case':<34} {'us/op':>12} {'baseline':>12} {'change':>8}")
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<34} {seconds * 1e6:>12.1f} {'-':>12} {'new':>8}")
+            continue
+        change = seconds / base - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<34} {seconds * 1e6:>12.1f} {base * 1e6:>12.1f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown before a case is flagged, as a fraction (default 0.25)")
+    parser.add_argument("--quick", action="store_true", help="Skip the largest arm counts and threads")
+    parser.add_argument("-k", dest="pattern", default="", help="Only run cases containing this text")
+    args = parser.parse_args(argv)
+
+    random.seed(0)
+    results = {}
+    for name, run in cases(args.quick).items():
+        if args.pattern in name:
+            results[name] = run()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({'python': sys.version.split()[0], 'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       'results': dict(baseline, **results)}, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+import streamlit as st
+
+from backend.metrics import Metrics, metrics as process_metrics
+
+
+def show_stats(metrics: Metrics = process_metrics):
+    """
+    Shows latency percentiles, error rates and counters recorded by this process.
+
+    Args:
+        metrics (Metrics): Metrics to show, the process-wide ones by default.
+    """
+    rows = metrics.summary()
+    if not rows:
+        st.caption("No metrics recorded yet.")
+        return
+    st.markdown("**Latency**")
+    st.dataframe(rows, hide_index=True)
+    st.markdown("**Counters**")
+    st.dataframe(metrics.counter_rows(), hide_index=True)
@@ -1,6 +1,14 @@
+import json
+
 from streamlit import runtime
 from streamlit.components.v1 import html
 
+
+def js_string(value) -> str:
+    # JSON strings are valid JS string literals; "</" is split so it cannot close the script tag
+    return json.dumps(str(value)).replace("</", "<\\/")
+
+
 def send_push(title: str = "Pass TITLE as an argument 🔥",
             body: str = "Pass BODY as an argument 👨🏻‍💻",
             icon_path: str = "",
@@ -31,11 +39,11 @@ def send_push(title: str = "Pass TITLE as an argument 🔥",
 
 
     variables = f"""
-    var title = "{title}";
-    var body = "{body}";
-    var icon = "{icon_path_on_server}";
-    var audio = "{sound_path_on_server}";
-    var tag = "{tag}";
+    var title = {js_string(title)};
+    var body = {js_string(body)};
+    var icon = {js_string(icon_path_on_server)};
+    var audio = {js_string(sound_path_on_server)};
+    var tag = {js_string(tag)};
     var notificationSent = false; // Flag to track notification state
     """
 
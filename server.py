@@ -1,36 +1,227 @@
+"""
+HTTP API around the recommender, so front ends can stay thin clients.
+
+Endpoints (users are identified by the `user` query parameter or JSON field):
+    GET  /sample?user=...&n=...   Sample a batch of n items.
+    GET  /digest?user=...&n=...   One item from each of n distinct arms, within ?deadline= seconds.
+    GET  /arms?user=...           Current arms, as returned by Recommender.get_arms().
+    POST /arms                    {"user": ..., "arms": [...]}, applied with Recommender.update_arms().
+    POST /feedback                {"user": ..., "message": ...}, scored locally or by the LLM.
+    POST /events                  {"user": ..., "key": ..., "event": ...}, an upvote, downvote or click on
+                                  a served item (by the `key` returned with it), learned by the bandit.
+    GET  /metrics                 Latency histograms and counters in the Prometheus text format.
+
+Requests are served on one event loop; sampling, snapshot IO and LLM calls run off it. Samplers are
+shared by all users of the process, and calls to each upstream API are bounded by
+recsys.upstream_limits. Recommender state lives in the snapshot store, so several processes can
+serve the same users as long as each user is routed to one process at a time.
+
+Run with `python server.py`, the port is taken from $PORT (default 8000).
+"""
+import asyncio
+import json
 import os
 import sys
+import time
+from typing import Optional
 testdir = os.path.dirname(__file__)
 srcdir = "./backend"
 sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
 
-from flask import Flask
-from requests import request
-app = Flask(__name__)
+from aiohttp import web
 
 from backend import llm
-from backend import recsys
+from backend.fastpath import InterestScorer
+from backend.metrics import metrics
+from backend.recsys import FEEDBACK_REWARDS
+from backend.registry import recommenders
+from backend.snapshot import item_to_record
+
+# Largest batch a single /sample or /digest request may ask for
+MAX_BATCH = 50
+# Longest a /digest request may wait for its fetches, in seconds
+MAX_DEADLINE = 30.0
+
+routes = web.RouteTableDef()
+fast_scorer = InterestScorer()
+_llm = None
+
+
+def get_llm():
+    # Created on the first feedback message that needs it
+    global _llm
+    if _llm is None:
+        _llm = llm.ChatMistralAI(
+            model="mistral-large-latest",
+            temperature=0,
+            max_retries=5,
+            mistral_api_key=os.getenv("MISTRAL_API_KEY")
+        )
+    return _llm
+
+
+def dumps(value) -> str:
+    # Item fields may hold values json can't encode natively
+    return json.dumps(value, default=str)
+
 
+def error(message: str, status: int = 400) -> web.Response:
+    return web.json_response({"error": message}, status=status)
 
-llm = llm.ChatMistralAI(
-    model="mistral-large-latest",
-    temperature=0,
-    max_retries=5,
-    mistral_api_key=os.getenv("MISTRAL_API_KEY")
-)
 
-sampler_map = {
-    recsys.SamplerType.GNEWS: recsys.GNewsSampler(),
-}
+async def read_body(request: web.Request) -> Optional[dict]:
+    """Returns the request's JSON body, or None if it is not a JSON object."""
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def arms_to_json(arms_config: dict) -> dict:
+    """Replaces SamplerType members with their names so the config can be sent as JSON."""
+    return {'arms': [dict(arm, sampler_type=getattr(arm['sampler_type'], 'name', arm['sampler_type']))
+                     for arm in arms_config['arms']]}
+
+
+def item_to_json(item) -> dict:
+    # The key lets clients send events about the item
+    return dict(item_to_record(item), key=item.key)
 
-@app.route("/generate_topics", methods=["POST"])
-def generate_topics():
-    user_input = request.json.get("user_input")
-    if not user_input:
-        return {"error": "user_input is required"}, 400
 
+async def get_recommender(user: str):
+    # Restoring from a snapshot reads from disk
+    return await asyncio.to_thread(recommenders.get, user)
+
+
+@routes.get("/sample")
+async def sample(request: web.Request):
+    user = request.query.get("user")
+    if not user:
+        return error("user is required")
     try:
-        topics = llm.generate_topics(llm, user_input)
-        return {"topics": topics}, 200
+        n = int(request.query.get("n", 1))
+    except ValueError:
+        return error("n must be an integer")
+    if not 1 <= n <= MAX_BATCH:
+        return error(f"n must be between 1 and {MAX_BATCH}")
+
+    rec = await get_recommender(user)
+    try:
+        items = await rec.asample_batch(n)
     except Exception as e:
-        return {"error": str(e)}, 500
\ No newline at end of file
+        return error(str(e), 502)
+    return web.json_response({"items": [item_to_json(item) for item in items]}, dumps=dumps)
+
+
+@routes.get("/digest")
+async def digest(request: web.Request):
+    user = request.query.get("user")
+    if not user:
+        return error("user is required")
+    try:
+        n = int(request.query.get("n", 3))
+        deadline = float(request.query.get("deadline", 5.0))
+    except ValueError:
+        return error("n must be an integer and deadline a number")
+    if not 1 <= n <= MAX_BATCH or not 0 < deadline <= MAX_DEADLINE:
+        return error(f"n must be between 1 and {MAX_BATCH}, deadline between 0 and {MAX_DEADLINE}")
+
+    rec = await get_recommender(user)
+    try:
+        items = await asyncio.to_thread(rec.sample_digest, n, deadline)
+    except ValueError as e:
+        return error(str(e), 409)
+    return web.json_response({"items": [item_to_json(item) for item in items]}, dumps=dumps)
+
+
+@routes.get("/arms")
+async def get_arms(request: web.Request):
+    user = request.query.get("user")
+    if not user:
+        return error("user is required")
+    rec = await get_recommender(user)
+    return web.json_response(arms_to_json(rec.get_arms()), dumps=dumps)
+
+
+@routes.post("/arms")
+async def update_arms(request: web.Request):
+    body = await read_body(request)
+    if body is None:
+        return error("body must be a JSON object")
+    user = body.get("user")
+    if not user or not isinstance(body.get("arms"), list):
+        return error("user and arms are required")
+    rec = await get_recommender(user)
+    try:
+        changes = rec.update_arms({'arms': body["arms"]})
+    except (KeyError, TypeError, ValueError) as e:
+        return error(f"Invalid arms config: {e}")
+    if changes:
+        await asyncio.to_thread(recommenders.save, user)
+    return web.json_response(dict(arms_to_json(rec.get_arms()), changes=changes.to_dict()), dumps=dumps)
+
+
+@routes.post("/feedback")
+async def feedback(request: web.Request):
+    body = await read_body(request)
+    if body is None:
+        return error("body must be a JSON object")
+    user, message = body.get("user"), body.get("message")
+    if not user or not message:
+        return error("user and message are required")
+    rec = await get_recommender(user)
+    original_arms = rec.get_arms()
+
+    # Simple feedback on existing topics is scored locally, everything else goes to the LLM
+    fast = fast_scorer.score(original_arms, message)
+    if fast.handled:
+        changes = rec.update_arms(fast.arms_config)
+        path = "local"
+        fast_scorer.record(path, fast.latency)
+        metrics.observe("feedback_seconds", fast.latency, path=path)
+    else:
+        path = "llm"
+        start = time.perf_counter()
+        try:
+            with metrics.timed("feedback", path=path):
+                updated_arms = await llm.aupdate_arm_scores(get_llm(), original_arms, message)
+        except Exception as e:
+            return error(f"Could not score feedback: {e}", 502)
+        finally:
+            fast_scorer.record(path, time.perf_counter() - start)
+        changes = rec.update_arms(updated_arms.dict())
+    if changes:
+        await asyncio.to_thread(recommenders.save, user)
+    return web.json_response(dict(arms_to_json(rec.get_arms()), changes=changes.to_dict(), path=path),
+                             dumps=dumps)
+
+
+@routes.post("/events")
+async def events(request: web.Request):
+    body = await read_body(request)
+    if body is None:
+        return error("body must be a JSON object")
+    user, key, event = body.get("user"), body.get("key"), body.get("event")
+    if not user or not key or event not in FEEDBACK_REWARDS:
+        return error(f"user, key and an event out of {sorted(FEEDBACK_REWARDS)} are required")
+    rec = await get_recommender(user)
+    # In memory only, like pulls; the snapshot is written with the next arms update or on eviction
+    recorded = rec.record_feedback(key, event)
+    return web.json_response({"recorded": recorded})
+
+
+@routes.get("/metrics")
+async def scrape_metrics(request: web.Request):
+    return web.Response(text=metrics.render(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app.add_routes(routes)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), port=int(os.getenv("PORT", 8000)))
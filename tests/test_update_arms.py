@@ -0,0 +1,24 @@
+import pytest
+
+from backend.policy import ThompsonBandit, UCBBandit
+from backend.recsys import ArrayBandit, Bandit, Recommender, SumTreeBandit
+from benchmarks.fakes import arms_config, fake_samplers
+
+BANDITS = [Bandit, ArrayBandit, SumTreeBandit, ThompsonBandit, UCBBandit]
+
+
+@pytest.mark.parametrize("bandit_cls", BANDITS, ids=lambda cls: cls.__name__)
+def test_update_arms_merges_a_duplicated_new_arm(bandit_cls):
+    rec = Recommender([], samplers=fake_samplers(), bandit_cls=bandit_cls)
+    rec.update_arms(arms_config(3))
+    config = arms_config(3)
+    new_arm = {'name': "new", 'params': {'query': "new"}, 'sampler_type': "GNEWS", 'score': 6.0}
+    config['arms'] += [new_arm, dict(new_arm, score=8.0)]
+
+    changes = rec.update_arms(config)
+
+    assert changes.added == ["new"]
+    assert "new" not in changes.changed
+    assert [arm.score for arm in rec.bandit.arms if arm.name == "new"] == [8.0]
+    assert len(rec.bandit.arms) == 4
+    rec.bandit.select_arm()